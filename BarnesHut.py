@@ -0,0 +1,134 @@
+import numpy as np
+import Physics as physics
+
+
+#Spread the lower 32 bits of each integer so a zero bit sits between every pair, used to build Morton codes
+def spread_bits(v):
+    v = v.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+
+#A quadtree stored as flat arrays, one entry per node, built level by level from the bodies' Morton codes
+class QuadTree:
+    def __init__(self, positions, masses, max_depth=20):
+        n = len(positions)
+        lower = positions.min(axis=0)
+        size = float(np.max(positions.max(axis=0) - lower)) * (1 + 1e-9) or 1.0
+        cells = 2 ** max_depth
+        ij = np.clip(((positions - lower) / size * cells).astype(np.int64), 0, cells - 1)
+        self.codes = spread_bits(ij[:, 0]) | (spread_bits(ij[:, 1]) << np.uint64(1))
+        self.max_depth = max_depth
+
+        order = np.argsort(self.codes, kind='stable')
+        codes = self.codes[order]
+        weighted = positions[order] * masses[order, np.newaxis]
+
+        keys, shifts, node_mass, com, widths, first_child, children = [], [], [], [], [], [], []
+        node_count = 0
+        #Bodies (positions in Morton order) that still share a cell with another body
+        idx = np.arange(n)
+        parent_keys = None
+        parent_ids = None
+
+        for level in range(max_depth + 1):
+            if not idx.size:
+                break
+            shift = np.uint64(2 * (max_depth - level))
+            level_keys = codes[idx] >> shift
+            starts = np.flatnonzero(np.r_[True, level_keys[1:] != level_keys[:-1]])
+            counts = np.diff(np.r_[starts, idx.size])
+            level_mass = np.add.reduceat(masses[order][idx], starts)
+            level_com = np.add.reduceat(weighted[idx], starts) / np.where(level_mass > 0, level_mass, 1)[:, np.newaxis]
+            ids = node_count + np.arange(starts.size)
+
+            #Link every cell to its parent, children of one parent are contiguous in Morton order
+            if parent_keys is not None:
+                parents = parent_ids[np.searchsorted(parent_keys, level_keys[starts] >> np.uint64(2))]
+                unique_parents, first, number = np.unique(parents, return_index=True, return_counts=True)
+                first_child[unique_parents] = ids[first]
+                children[unique_parents] = number
+
+            keys.append(level_keys[starts])
+            shifts.append(np.full(starts.size, shift))
+            node_mass.append(level_mass)
+            com.append(level_com)
+            widths.append(np.full(starts.size, size / 2 ** level))
+            first_child = np.r_[first_child if level else np.zeros(0, dtype=np.int64), np.zeros(starts.size, dtype=np.int64)]
+            children = np.r_[children if level else np.zeros(0, dtype=np.int64), np.zeros(starts.size, dtype=np.int64)]
+            node_count += starts.size
+
+            #Only cells holding more than one body are split further
+            split = counts > 1
+            parent_keys = level_keys[starts][split]
+            parent_ids = ids[split]
+            idx = idx[np.repeat(split, counts)]
+
+        self.keys = np.concatenate(keys)
+        self.shifts = np.concatenate(shifts)
+        self.mass = np.concatenate(node_mass)
+        self.com = np.concatenate(com)
+        self.width = np.concatenate(widths)
+        self.first_child = first_child
+        self.children = children
+
+
+#Barnes-Hut force solver, treats distant groups of bodies as one body at their centre of mass
+class BarnesHut:
+    def __init__(self, theta=0.5, threshold=256, softening=0.0, chunk=4096):
+        #Opening angle, a node is opened if its width is more than theta times its distance
+        self.theta = theta
+        #Below this many bodies direct summation is both faster and exact
+        self.threshold = threshold
+        self.softening = softening
+        #Bodies walked through the tree at once, bounds memory
+        self.chunk = chunk
+
+    def __call__(self, positions, masses, G=physics.G):
+        positions = np.asarray(positions, dtype=np.float64)
+        masses = np.asarray(masses, dtype=np.float64)
+        if len(positions) < self.threshold:
+            return physics.accelerations(positions, masses, G)
+
+        #The tree is rebuilt every step
+        tree = QuadTree(positions, masses)
+        acc = np.zeros_like(positions)
+        for start in range(0, len(positions), self.chunk):
+            stop = min(start + self.chunk, len(positions))
+            acc[start:stop] = self.walk(tree, positions, np.arange(start, stop), G)
+        return acc
+
+    #Walk the tree for a group of bodies at once, each (body, node) pair is either accepted or opened into its children
+    def walk(self, tree, positions, bodies, G):
+        offset = bodies[0]
+        count = len(bodies)
+        ax = np.zeros(count)
+        ay = np.zeros(count)
+        body = bodies
+        node = np.zeros(count, dtype=np.int64)
+        theta_sq = self.theta ** 2
+        eps_sq = self.softening ** 2
+
+        while body.size:
+            d = tree.com[node] - positions[body]
+            r_sq = np.einsum('ij,ij->i', d, d)
+            #A node is opened if it is too close or contains the body itself
+            contains = (tree.codes[body] >> tree.shifts[node]) == tree.keys[node]
+            is_open = (tree.children[node] > 0) & (contains | (tree.width[node] ** 2 > theta_sq * r_sq))
+            #A leaf containing the body is the body itself (or bodies closer than the finest cell)
+            accept = ~is_open & ~contains
+
+            weight = G * tree.mass[node[accept]] * (r_sq[accept] + eps_sq) ** -1.5
+            ax += np.bincount(body[accept] - offset, weights=weight * d[accept, 0], minlength=count)
+            ay += np.bincount(body[accept] - offset, weights=weight * d[accept, 1], minlength=count)
+
+            opened = node[is_open]
+            number = tree.children[opened]
+            body = np.repeat(body[is_open], number)
+            node = np.repeat(tree.first_child[opened], number) + np.arange(number.sum()) - np.repeat(np.cumsum(number) - number, number)
+
+        return np.column_stack((ax, ay))
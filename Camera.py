@@ -0,0 +1,68 @@
+import numpy as np
+
+
+#Owns the zoom and pan of the view and converts between world coordinates (metres) and screen pixels
+class Camera:
+    #Most zoomed out scale allowed
+    MIN_SCALE = 1.8401069518717394e-10
+    #Pixels beyond the window edge that still count as visible
+    MARGIN = 50
+
+    def __init__(self, scale, width, height):
+        #Pixels per metre
+        self.scale = scale
+        self.width = width
+        self.height = height
+        #Screen position of the world origin
+        self.centre_x = width // 2
+        self.centre_y = height // 2
+
+    def resize(self, width, height):
+        self.width = width
+        self.height = height
+
+    #Move the view by a number of pixels
+    def pan(self, dx, dy):
+        self.centre_x += dx
+        self.centre_y += dy
+
+    def zoom(self, amount):
+        self.scale = max(self.MIN_SCALE, self.scale + amount)
+
+    #Convert one (x, y) position or an array of them to screen coordinates
+    def world_to_screen(self, positions):
+        positions = np.asarray(positions, dtype=np.float64)
+        return positions * self.scale + (self.centre_x, self.centre_y)
+
+    #Convert one (x, y) screen point or an array of them to world coordinates
+    def screen_to_world(self, points):
+        points = np.asarray(points, dtype=np.float64)
+        return (points - (self.centre_x, self.centre_y)) / self.scale
+
+    #Which screen points are within the window plus a margin (e.g. a body's radius)
+    def visible(self, points, margin=MARGIN):
+        points = np.asarray(points, dtype=np.float64)
+        x = points[..., 0]
+        y = points[..., 1]
+        return (x >= -margin) & (x <= self.width + margin) & (y >= -margin) & (y <= self.height + margin)
+
+    #Split a screen space polyline into the runs of segments that can be seen
+    def cull_polyline(self, points, margin=MARGIN):
+        points = np.asarray(points, dtype=np.float64)
+        if len(points) < 2:
+            return []
+        start = points[:-1]
+        end = points[1:]
+        #A segment is kept if its bounding box overlaps the window
+        lower = np.minimum(start, end)
+        upper = np.maximum(start, end)
+        shown = (upper[:, 0] >= -margin) & (lower[:, 0] <= self.width + margin) \
+            & (upper[:, 1] >= -margin) & (lower[:, 1] <= self.height + margin)
+        if shown.all():
+            return [points]
+
+        #Segment indices where runs of shown segments begin and end
+        edges = np.diff(np.r_[0, shown.astype(np.int8), 0])
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1)
+        return [points[a:b + 1] for a, b in zip(run_starts, run_ends)]
@@ -0,0 +1,126 @@
+import ast
+import math
+import operator
+import Physics as physics
+
+#One astronomical unit in metres, positions in the database are stored in AU
+AU = 149.6e6 * 1000
+
+#Bodies in the database that are never simulated
+HIDDEN_BODIES = ('Lebron',)
+
+#Initial orbital speed along the y axis in km/s, negative values orbit the other way
+#Only used to fill in the velocity columns of databases created before they existed (see Schema)
+INITIAL_Y_VELOCITIES = {
+    'Sun': 0,
+    'Mercury': -47.4,
+    'Venus': -35.02,
+    'Earth': 29.783,
+    'Mars': 24.077,
+    'Jupiter': -13.06,
+    'Saturn': -9.68,
+    'Uranus': -6.80,
+    'Neptune': -5.43,
+    'Lebron': 0,
+}
+
+#Every body in one pass, in the order they were added (which is the order they are drawn)
+BODY_SELECT = """
+    SELECT celestial_bodies.id,
+           celestial_bodies.name,
+           position.x,
+           position.y,
+           position.x_vel,
+           position.y_vel,
+           physical_properties.radiusscale,
+           physical_properties.colour,
+           physical_properties.mass,
+           physical_properties.orbital_period
+    FROM celestial_bodies
+    JOIN position ON celestial_bodies.id = position.celestial_body_id
+    JOIN physical_properties ON celestial_bodies.id = physical_properties.celestial_body_id
+"""
+BODY_QUERY = BODY_SELECT + "    ORDER BY celestial_bodies.id\n"
+
+
+#Arithmetic allowed in masses stored as text, the original editor evaluated them
+OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+
+#Evaluate plain arithmetic on numbers, e.g. "1*10*5", without running arbitrary code
+def evaluate_arithmetic(node):
+    if isinstance(node, ast.Expression):
+        return evaluate_arithmetic(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return float(node.value)
+    if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+        return OPERATORS[type(node.op)](evaluate_arithmetic(node.left), evaluate_arithmetic(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in OPERATORS:
+        return OPERATORS[type(node.op)](evaluate_arithmetic(node.operand))
+    raise ValueError(f"Not plain arithmetic: {ast.dump(node)}")
+
+
+#Convert a mass stored as a number or as text, e.g. "5.9722 * 10**24" or "2*3*10**5", to kg without running arbitrary code
+def parse_mass(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        mass = evaluate_arithmetic(ast.parse(value.strip(), mode='eval'))
+    except (SyntaxError, TypeError, OverflowError, ZeroDivisionError) as e:
+        raise ValueError(f"Mass is not a number: {value!r}") from e
+    # floats overflow to inf rather than raising in some operations
+    if not math.isfinite(mass):
+        raise ValueError(f"Mass is not finite: {value!r}")
+    return mass
+
+
+#Convert a row of BODY_SELECT without its id to (name, x, y, x_vel, y_vel, radiusscale, colour, mass, orbital_period) in SI units
+def to_body(row):
+    name, x, y, x_vel, y_vel, radiusscale, colour, mass, orbital_period = row
+    # a mass left empty by a migration that could not read it attracts nothing until it is set again
+    return (name, x * AU, y * AU, (x_vel or 0) * 1000, (y_vel or 0) * 1000,
+            radiusscale, colour, 0.0 if mass is None else parse_mass(mass), orbital_period)
+
+
+#Load bodies from the database keyed by id, in the order they were added, as rows of (name, x, y, x_vel, y_vel, radiusscale, colour, mass, orbital_period) in SI units
+#By default every body except the hidden ones is loaded, otherwise only the named ones, either way the filtering is done by the query
+def load_body_rows(conn, names=None):
+    if names is None:
+        names, condition = HIDDEN_BODIES, "NOT IN"
+    else:
+        condition = "IN"
+    placeholders = ", ".join("?" * len(names))
+    query = BODY_SELECT + f"    WHERE celestial_bodies.name {condition} ({placeholders})\n    ORDER BY celestial_bodies.id\n"
+    return {id: to_body(row) for id, *row in conn.execute(query, tuple(names))}
+
+
+#Load bodies from the database, returns rows of (name, x, y, x_vel, y_vel, radiusscale, colour, mass, orbital_period) in SI units
+def load_bodies(conn, names=None):
+    return list(load_body_rows(conn, names).values())
+
+
+#Add loaded bodies to a system in one go, the body named Sun (if any) is held in place, returns the range of their rows
+def add_bodies(system, bodies):
+    names = [body[0] for body in bodies]
+    positions = [body[1:3] for body in bodies]
+    velocities = [body[3:5] for body in bodies]
+    masses = [body[7] for body in bodies]
+    rows = system.add_bodies(positions, velocities, masses)
+    if 'Sun' in names:
+        system.set_sun(rows[names.index('Sun')])
+    return rows
+
+
+#Build a system from loaded bodies, the body named Sun is held in place
+def build_system(bodies, G=physics.G):
+    system = physics.BodySystem(G)
+    add_bodies(system, bodies)
+    return system
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import numpy as np
+import Particles as particles
+
+#Bumped when the layout of a checkpoint changes, older checkpoints are then ignored
+#2: fingerprint of each body's database row
+#3: trail points of every body one after another instead of one full size block per body
+FORMAT_VERSION = 3
+
+#File the simulator saves to unless PLANETORBIT_CHECKPOINT says otherwise
+DEFAULT_PATH = 'checkpoint.npz'
+
+
+#Identify a body's database row as loaded by Catalogue.load_bodies, so a body edited since a save is not resumed
+def fingerprint(body):
+    return hashlib.sha1(repr(tuple(body)).encode()).hexdigest()
+
+
+#Delete a checkpoint so the next run starts from the database
+def discard(path):
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+#Write the whole simulation state to a compressed .npz file, bodies are identified by name so they can be matched on restore
+#names, trails and fingerprints have one entry per row of the system, rows named None (e.g. deleted bodies) are left out
+#The file is written next to the old one and swapped in, so a crash while saving never leaves a broken checkpoint
+def save(path, system, names, trails, timestep, fingerprints):
+    rows = [i for i, name in enumerate(names) if name is not None]
+    names = [names[i] for i in rows]
+    trails = [trails[i] for i in rows]
+    fingerprints = [fingerprints[i] or '' for i in rows]
+    swarms = system.particles
+    snapshots = [trail.snapshot() for trail in trails]
+    data = {
+        'format_version': FORMAT_VERSION,
+        'names': np.array(names, dtype=str),
+        'fingerprints': np.array(fingerprints, dtype=str),
+        'positions': system.positions[rows],
+        'velocities': system.velocities[rows],
+        'masses': system.masses[rows],
+        'time': system.time,
+        'timestep': timestep,
+        'particle_names': np.array([swarm.name for swarm in swarms], dtype=str),
+        'particle_colours': np.array([swarm.colour for swarm in swarms], dtype=np.int64).reshape(len(swarms), 3),
+        'particle_counts': np.array([len(swarm) for swarm in swarms], dtype=np.int64),
+        'particle_positions': np.vstack([swarm.positions for swarm in swarms]) if swarms else np.zeros((0, 2)),
+        'particle_velocities': np.vstack([swarm.velocities for swarm in swarms]) if swarms else np.zeros((0, 2)),
+    }
+    if trails:
+        data['trail_config'] = np.array([trails[0].duration, trails[0].interval, trails[0].capacity])
+        points, times, heads, counts, evicted, last_time = zip(*snapshots)
+        #Trails hold different numbers of points, the counts say where each one's points start
+        data['trail_points'] = np.concatenate(points)
+        data['trail_times'] = np.concatenate(times)
+        data['trail_heads'] = np.array(heads)
+        data['trail_counts'] = np.array(counts)
+        data['trail_evicted'] = np.array(evicted)
+        data['trail_last_time'] = np.array(last_time)
+
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        np.savez_compressed(file, **data)
+    os.replace(temporary, path)
+
+
+#Read a checkpoint into memory, returns None if there is none or it cannot be used
+def load(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as file:
+            data = {key: file[key] for key in file.files}
+    except (OSError, ValueError, EOFError):
+        return None
+    if data.get('format_version') != FORMAT_VERSION:
+        return None
+    return data
+
+
+#Restore a loaded checkpoint into a system whose rows have the given names, trails and fingerprints
+#Bodies not in the checkpoint, or whose database row has changed since it was saved, keep their state
+#Trails are only restored if they were saved with the same duration, interval and capacity, returns the names restored
+def restore(data, system, names, trails, fingerprints):
+    saved = {str(name): i for i, name in enumerate(data['names'])}
+    same_trails = ('trail_config' in data and trails and
+                   np.array_equal(data['trail_config'], [trails[0].duration, trails[0].interval, trails[0].capacity]))
+    if same_trails:
+        trail_starts = np.concatenate(([0], np.cumsum(data['trail_counts'].sum(axis=1))))
+    restored = []
+    for index, name in enumerate(names):
+        i = saved.get(name)
+        if i is None or str(data['fingerprints'][i]) != fingerprints[index]:
+            continue
+        system.positions[index] = data['positions'][i]
+        system.velocities[index] = data['velocities'][i]
+        system.masses[index] = data['masses'][i]
+        if same_trails:
+            points = slice(trail_starts[i], trail_starts[i + 1])
+            trails[index].restore((data['trail_points'][points], data['trail_times'][points], data['trail_heads'][i],
+                                   data['trail_counts'][i], data['trail_evicted'][i], data['trail_last_time'][i]))
+        restored.append(name)
+
+    system.time = float(data['time'])
+    #Saved swarms replace the swarms of the same name, swarms that were not saved are kept
+    swarms = {swarm.name: swarm for swarm in system.particles}
+    start = 0
+    for name, colour, count in zip(data['particle_names'], data['particle_colours'], data['particle_counts']):
+        stop = start + int(count)
+        swarms[str(name)] = particles.ParticleSwarm(data['particle_positions'][start:stop], data['particle_velocities'][start:stop],
+                                                    tuple(int(c) for c in colour), str(name))
+        start = stop
+    system.particles = list(swarms.values())
+    system.update_distances()
+    return restored
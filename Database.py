@@ -1,7 +1,13 @@
 import pygame
 from pygame.locals import *
+import os
 import sys
 import sqlite3 as sql
+import Idle
+import Catalogue as catalogue
+import Checkpoint as checkpoint
+import Schema as schema
+import Store
 
 # Initialise Pygame display and variables
 pygame.init()
@@ -11,9 +17,10 @@ screen = pygame.display.set_mode((WIDTH, HEIGHT))
 FONT = pygame.font.Font('nasalization-rg.otf', 17)
 FONT_large = pygame.font.Font('nasalization-rg.otf', 40)
 
-# Initialise database connection
+# Initialise database connection, kept open for as long as the editor runs
 conn = sql.connect("Planets.db")
 c = conn.cursor()
+store = Store.BodyStore(conn)
 # Initialise colours
 colour_mapping = {
     'WHITE': (255, 255, 255),
@@ -34,64 +41,42 @@ colour_mapping = {
 
 # creating database function
 def create_db():
-    # creating celestial body table
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS celestial_bodies (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE
-            )
-            """)
-    # creating position table
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS position (
-
-            celestial_body_id INTEGER,
-            x REAL,
-            y REAL,
-            FOREIGN KEY(celestial_body_id) REFERENCES celestial_bodies(id)
-            )
-            """)
-    # creating physical properties table
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS physical_properties (
-
-            celestial_body_id INTEGER,
-            radiusscale REAL,
-            colour TEXT,
-            mass TEXT,
-            orbital_period REAL,
-            FOREIGN KEY(celestial_body_id) REFERENCES celestial_bodies(id)
-            )
-            """)
+    # creating the tables (or upgrading old ones) with the newest schema
+    schema.migrate(conn)
     # inserting names
     c.execute("""
             INSERT INTO celestial_bodies (name) 
             VALUES ('Sun'), ('Mercury'), ('Venus'), ('Earth'), ('Mars'), ('Jupiter'), ('Saturn'), ('Uranus'), ('Neptune'), ('Lebron')
             """)
-    # inserting coordinates
+    # inserting coordinates (AU) and initial velocities (km/s)
     c.execute("""
-            INSERT INTO position (celestial_body_id, x, y)
-            VALUES (1, 0, 0), (2, 0.387, 0), (3, 0.723, 0), (4, -1, 0), (5, -1.524, 0), (6, 5.203, 0), (7, 9.537, 0), (8, 19.191, 0), (9, 30.069, 0), (10, 0.000, 0)
+            INSERT INTO position (celestial_body_id, x, y, x_vel, y_vel)
+            VALUES (1, 0, 0, 0, 0), (2, 0.387, 0, 0, -47.4), (3, 0.723, 0, 0, -35.02), (4, -1, 0, 0, 29.783), (5, -1.524, 0, 0, 24.077),
+                    (6, 5.203, 0, 0, -13.06), (7, 9.537, 0, 0, -9.68), (8, 19.191, 0, 0, -6.80), (9, 30.069, 0, 0, -5.43), (10, 0.000, 0, 0, 0)
             """)
     # inserting radius scale, colour, mass, orbital_period
     c.execute("""
             INSERT INTO physical_properties (celestial_body_id, radiusscale, colour, mass, orbital_period)
-            VALUES (1, 2, "YELLOW", "1.98840 * 10**30", 0), 
-                    (2, 0.38, "DARK_GREY", "3.30110 * 10**23", 87.969), 
-                    (3, 0.95, "WHITE", "4.8673 * 10**24", 224.701),
-                    (4, 1, "LIGHT_BLUE", "5.9722 * 10**24", 365.2),
-                    (5, 0.53, "RED", "6.4169 * 10**23", 686.98),
-                    (6, 1.8, "PEARL_WHITE", "1.89813 * 10**27", 4332.59),
-                    (7, 1.65, "YELLOWISH_BROWN", "5.688 * 10**26", 10759.22),
-                    (8, 1.35, "AQUA", "8.6811 * 10**25", 30688.5),
-                    (9, 1.25, "NAVY", "1.02409 * 10**26", 60190.0),
-                    (10, 2, "YELLOW", "1.98840 * 10**30", 0)
+            VALUES (1, 2, "YELLOW", 1.98840e30, 0), 
+                    (2, 0.38, "DARK_GREY", 3.30110e23, 87.969), 
+                    (3, 0.95, "WHITE", 4.8673e24, 224.701),
+                    (4, 1, "LIGHT_BLUE", 5.9722e24, 365.2),
+                    (5, 0.53, "RED", 6.4169e23, 686.98),
+                    (6, 1.8, "PEARL_WHITE", 1.89813e27, 4332.59),
+                    (7, 1.65, "YELLOWISH_BROWN", 5.688e26, 10759.22),
+                    (8, 1.35, "AQUA", 8.6811e25, 30688.5),
+                    (9, 1.25, "NAVY", 1.02409e26, 60190.0),
+                    (10, 2, "YELLOW", 1.98840e30, 0)
     """)
     conn.commit()
+    store.invalidate()
 
 # resetting database
 def reset_db():
     try:
+        # dropping a table does not fire its delete triggers, so every body is logged as changed for a running simulation to drop
+        if schema.table_exists(conn, 'body_changes') and schema.table_exists(conn, 'celestial_bodies'):
+            c.execute("INSERT OR REPLACE INTO body_changes (celestial_body_id) SELECT id FROM celestial_bodies")
         # deleting existing tables
         c.execute("DROP TABLE IF EXISTS celestial_bodies")
         c.execute("DROP TABLE IF EXISTS position")
@@ -99,98 +84,122 @@ def reset_db():
         # recreates them
         create_db()
         conn.commit()
+        store.invalidate()
+        # the simulation starts over from the reset database rather than resuming
+        checkpoint.discard(os.environ.get('PLANETORBIT_CHECKPOINT', checkpoint.DEFAULT_PATH))
         return True
-    except sql.Error as e:
+    except (sql.Error, OSError) as e:
         return e
 
-# fetching data
-def fetch_data():
-    conn = sql.connect('Planets.db')
-    c = conn.cursor()
+# Table layout, only ROWS_PER_PAGE rows are drawn at a time and the rest are reached by scrolling
+HEADERS = ["Name", "X Coord", "Radius Scale", "Mass"]
+HEADER_Y = 125
+HEADER_HEIGHT = 40
+ROW_HEIGHT = 40
+COLUMN_WIDTH = 200
+ROWS_PER_PAGE = 10
+# rows moved per mouse wheel notch
+SCROLL_ROWS = 3
 
-    c.execute("""
-        SELECT celestial_bodies.name, position.x, physical_properties.radiusscale, physical_properties.mass
-        FROM celestial_bodies
-        JOIN position ON celestial_bodies.id = position.celestial_body_id
-        JOIN physical_properties ON celestial_bodies.id = physical_properties.celestial_body_id
-    """)
-    
-    data = c.fetchall()
-    conn.close()
-    return data
+# left edge of the table, centred in the window
+def table_x():
+    return WIDTH // 2 - len(HEADERS) * COLUMN_WIDTH // 2
+
+# fetching one page of rows (id first) matching the search, cached by the store until update() or reset_db() change it
+def fetch_data(search='', offset=0):
+    return store.page(search, offset, ROWS_PER_PAGE)
+
+# keeps the first row shown inside the rows matching the search
+def clamp_offset(offset, search=''):
+    return max(0, min(offset, store.count(search) - ROWS_PER_PAGE))
+
+# The drawn table is kept as a surface and only redrawn when its data or the window size changes
+table_data = None
+table_surface = None
 
 # displaying data
 def display_data(screen, data):
+    global table_data, table_surface
+    if data is not table_data or table_surface.get_size() != screen.get_size():
+        table_data = data
+        table_surface = pygame.Surface(screen.get_size())
+        draw_table(table_surface, data)
+    screen.blit(table_surface, (0, 0))
+
+# drawing the table
+def draw_table(screen, data):
     screen.fill(colour_mapping['BLACK'])
     title_text = FONT_large.render("Celestial Body Database", True, colour_mapping['LIGHT_SPACE'])
     screen.blit(title_text, (WIDTH//2 - title_text.get_width()//2, 20))
     
     # preparing headers
-    headers = ["Name", "X Coord", "Radius Scale", "Mass"]
-    header_x = WIDTH // 2 - len(headers) * 100
-    header_y = 125
-    spacing = 200
+    header_x = table_x()
+    header_y = HEADER_Y
+    spacing = COLUMN_WIDTH
+    right = header_x + len(HEADERS) * spacing
     
-    header_height = 40
-    pygame.draw.line(screen, colour_mapping['WHITE'], (header_x, header_y), (header_x + len(headers) * spacing, header_y),3)  # Top header line
-    pygame.draw.line(screen, colour_mapping['WHITE'], (header_x, header_y + header_height), (header_x + len(headers) * spacing, header_y + header_height), 3)  # Bottom header line
-
-    cell_positions = []
+    header_height = HEADER_HEIGHT
+    pygame.draw.line(screen, colour_mapping['WHITE'], (header_x, header_y), (right, header_y),3)  # Top header line
+    pygame.draw.line(screen, colour_mapping['WHITE'], (header_x, header_y + header_height), (right, header_y + header_height), 3)  # Bottom header line
 
     # draws headers with the text
-    for i, header in enumerate(headers):
+    for i, header in enumerate(HEADERS):
         header_text = FONT.render(header, True, colour_mapping['WHITE'])
         text_width = header_text.get_width()
         text_height = header_text.get_height()
         screen.blit(header_text, (header_x + i * spacing + (spacing //2 - text_width //2), header_y + (header_height // 2 - text_height // 2)))
         pygame.draw.line(screen, colour_mapping['WHITE'], (header_x + i * spacing, header_y), (header_x + i * spacing, header_y + header_height), 3)
 
-    pygame.draw.line(screen, colour_mapping['WHITE'], (header_x + len(headers) * spacing, header_y), (header_x + len(headers) * spacing, header_y + header_height), 3)
+    pygame.draw.line(screen, colour_mapping['WHITE'], (right, header_y), (right, header_y + header_height), 3)
 
-    # calculate row positions and renders data into a central position in each cell
-    row_y = header_y + 40 
-    row_height = 40
+    # renders the visible rows into a central position in each cell, the id is not shown
+    row_y = header_y + header_height
+    row_height = ROW_HEIGHT
     for row in data:
-        for i, value in enumerate(row):
+        for i, value in enumerate(row[1:]):
             cell_text = FONT.render(str(value), True, colour_mapping['WHITE'])
             text_width = cell_text.get_width()
             text_height = cell_text.get_height()
             screen.blit(cell_text, (header_x + i * spacing + (spacing //2 - text_width // 2), row_y + (row_height // 2 - text_height // 2)))
             pygame.draw.line(screen, colour_mapping['WHITE'], (header_x + i * spacing, row_y), (header_x + i * spacing, row_y + row_height), 1)
-        
-            cell_positions.append((header_x + i * spacing, row_y, spacing, row_height))
 
-        pygame.draw.line(screen, colour_mapping['WHITE'], (header_x, row_y), (header_x + len(headers) * spacing, row_y), 1)
+        pygame.draw.line(screen, colour_mapping['WHITE'], (header_x, row_y), (right, row_y), 1)
         row_y += row_height  # Move down for the next row
 
-    pygame.draw.line(screen, colour_mapping['WHITE'], (header_x, row_y), (header_x + len(headers) * spacing, row_y), 1)
-    pygame.draw.line(screen, colour_mapping['WHITE'], (header_x + len(headers) * spacing, header_y), (header_x + len(headers) * spacing, row_y), 1)
-
-    # returns the cell position of each cell in a list
-    cell_positions = [cell_positions[i:i + 4] for i in range(0, len(cell_positions), 4)]
-    return cell_positions
-
-# finding which cell the user clicks on
-def find_clicked_cell(cell_positions):
-    #Set up variables and headers
-    headers = ["Name", "X Coord", "Radius Scale", "Mass"]
-    planet_id = 0
-    field = 0
-    rect = 0
-    #iterate through each cell
-    for x, cell in enumerate(cell_positions):
-        #iterate through each item in that cell
-        for y, value in enumerate(cell): 
-            #detect if user mouse is in the cell's rectangle
-            if pygame.Rect(cell_positions[x][y]).collidepoint(pygame.mouse.get_pos()):
-                #assign the variables with values for that cell
-                planet_id = x+1
-                if y == 0:
-                    break
-                field = headers[y]
-                rect = pygame.Rect(value)
-    
-    return planet_id, field, rect
+    pygame.draw.line(screen, colour_mapping['WHITE'], (header_x, row_y), (right, row_y), 1)
+    pygame.draw.line(screen, colour_mapping['WHITE'], (right, header_y), (right, row_y), 1)
+
+# finding which cell the user clicks on from its row and column, returns the body's id, the field and the cell
+def find_clicked_cell(data, pos):
+    column = (pos[0] - table_x()) // COLUMN_WIDTH
+    row = (pos[1] - HEADER_Y - HEADER_HEIGHT) // ROW_HEIGHT
+    if pos[0] < table_x() or pos[1] < HEADER_Y + HEADER_HEIGHT or column >= len(HEADERS) or row >= len(data):
+        return 0, 0, 0
+    planet_id = data[row][0]
+    # names cannot be edited
+    if column == 0:
+        return planet_id, 0, 0
+    rect = pygame.Rect(table_x() + column * COLUMN_WIDTH, HEADER_Y + HEADER_HEIGHT + row * ROW_HEIGHT, COLUMN_WIDTH, ROW_HEIGHT)
+    return planet_id, HEADERS[column], rect
+
+# search box above the table, with the rows shown out of the rows matching
+search_rect = pygame.Rect(0, 85, 300, 30)
+
+def display_search(search, active, offset):
+    search_rect.x = table_x()
+    pygame.draw.rect(WIN, colour_mapping['DARK_SPACE'], search_rect)
+    if active:
+        pygame.draw.rect(WIN, colour_mapping['LIGHT_SPACE'], search_rect, 1)
+    if search or active:
+        text = FONT.render(search, True, colour_mapping['WHITE'])
+    else:
+        text = FONT.render("Search names...", True, colour_mapping['LIGHT_SPACE'])
+    WIN.blit(text, (search_rect.x + 5, search_rect.centery - text.get_height() // 2))
+
+    count = store.count(search)
+    shown = f"{offset + 1:,}-{min(offset + ROWS_PER_PAGE, count):,} of {count:,}" if count else "No matches"
+    text = FONT.render(shown, True, colour_mapping['WHITE'])
+    WIN.blit(text, (table_x() + len(HEADERS) * COLUMN_WIDTH - text.get_width(), search_rect.centery - text.get_height() // 2))
 
 # database status text
 def status_text(text):
@@ -242,6 +251,7 @@ def update(planet_id, field, value):
             SET x = ?
             WHERE celestial_body_id = ?""", (value, planet_id))
             conn.commit()
+            store.invalidate()
             return True
         except sql.Error as e:
             return "Error updating xcoord: {e}"
@@ -259,6 +269,7 @@ def update(planet_id, field, value):
             SET radiusscale = ?
             WHERE celestial_body_id = ?""", (value, planet_id))
             conn.commit()
+            store.invalidate()
             return True
         except sql.Error as e:
             return "Error updating radius: {e}"
@@ -276,8 +287,9 @@ def update(planet_id, field, value):
             try:
                 c.execute(""" UPDATE physical_properties
                 SET mass = ?
-                WHERE celestial_body_id = ?""", (value, planet_id))
+                WHERE celestial_body_id = ?""", (catalogue.parse_mass(value), planet_id))
                 conn.commit()
+                store.invalidate()
                 return True
             except sql.Error as e:
                 return "Error updating mass: {e}"
@@ -312,18 +324,30 @@ def main(c):
     input_active = False
     input_text = ''
     status = ''
+    search = ''
+    search_active = False
+    offset = 0
 
+    # Upgrades databases made by older versions before they are shown
+    for name, mass in schema.migrate(conn):
+        print(schema.unreadable_message(name, mass))
     # Attempts to display data
     try:
         display_data(screen, fetch_data())
     except sql.OperationalError:
         reset_db()
+    # The screen only changes in response to input, so it is redrawn after events instead of every frame
+    redraw = True
     # Main loop
     while True:
         WIDTH, HEIGHT = pygame.display.get_surface().get_size()
+        events = Idle.poll(not redraw)
+        if not events and not redraw:
+            continue
+        redraw = False
         screen.fill((0, 0, 0))
         #Event handling
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -331,6 +355,7 @@ def main(c):
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 # Checks if user clicked LMB
                 if event.button == 1:
+                    search_active = search_rect.collidepoint(event.pos)
                     # Checks if user clicked exit back to menu
                     if exit_button_rect.collidepoint(event.pos):
                         return 'menu'
@@ -339,14 +364,20 @@ def main(c):
                         reset_status = reset_db()
                         if reset_status == True:
                             status = 'Database Reset'
+                            offset = clamp_offset(offset, search)
                     else:
                         # Attempts to find which cell user clicked on
-                        planet_id, field, input_rect = find_clicked_cell(display_data(screen, fetch_data()))
+                        planet_id, field, input_rect = find_clicked_cell(fetch_data(search, offset), event.pos)
                         # Activates input box
                         if planet_id and input_rect:
                             input_active = True
                         if input_rect == 0:
                             input_active = False
+                # Scrolls the table with the mouse wheel
+                elif event.button == 4:
+                    offset = clamp_offset(offset - SCROLL_ROWS, search)
+                elif event.button == 5:
+                    offset = clamp_offset(offset + SCROLL_ROWS, search)
 
             # Updates values after display resize
             elif event.type == pygame.VIDEORESIZE:
@@ -367,9 +398,29 @@ def main(c):
                     if event.key == pygame.K_ESCAPE:
                         input_active = False
                         input_text = ''
-
-        # Displays data
-        display_data(screen, fetch_data())
+                # Takes in search text, the table shows matches from the top
+                elif search_active:
+                    if event.key == pygame.K_ESCAPE:
+                        search = ''
+                        search_active = False
+                    elif event.key == pygame.K_BACKSPACE:
+                        search = search[:-1]
+                    elif event.key != pygame.K_RETURN and event.unicode.isprintable():
+                        search += event.unicode
+                    offset = 0
+                # Scrolls the table a page at a time
+                elif event.key == pygame.K_PAGEDOWN:
+                    offset = clamp_offset(offset + ROWS_PER_PAGE, search)
+                elif event.key == pygame.K_PAGEUP:
+                    offset = clamp_offset(offset - ROWS_PER_PAGE, search)
+                elif event.key == pygame.K_DOWN:
+                    offset = clamp_offset(offset + 1, search)
+                elif event.key == pygame.K_UP:
+                    offset = clamp_offset(offset - 1, search)
+
+        # Displays the visible rows
+        display_data(screen, fetch_data(search, offset))
+        display_search(search, search_active, offset)
 
         # Renders exit btuton
         exit_button_rect = pygame.Rect(75, 135, 50, 20)
@@ -0,0 +1,108 @@
+import argparse
+import math
+import sqlite3 as sql
+import sys
+import time
+import numpy as np
+import Integrators as integrators
+import BarnesHut as barneshut
+import Catalogue as catalogue
+import Schema as schema
+
+DAY = 3600 * 24
+YEAR = 365.25 * DAY
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': DAY, 'y': YEAR}
+
+
+#Parse a number that must be finite and greater than zero
+def positive_float(text):
+    try:
+        value = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' is not a number")
+    if not (value > 0 and math.isfinite(value)):
+        raise argparse.ArgumentTypeError(f"'{text}' must be greater than zero")
+    return value
+
+
+#Parse a duration such as 3600, 90s, 1h, 10d or 2y into seconds, it must be greater than zero
+def parse_duration(text):
+    text = text.strip().lower()
+    unit = UNITS.get(text[-1:])
+    try:
+        seconds = float(text) if unit is None else float(text[:-1]) * unit
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' is not a duration, e.g. 3600, 1h, 10d or 2y")
+    if not (seconds > 0 and math.isfinite(seconds)):
+        raise argparse.ArgumentTypeError(f"'{text}' must be a duration greater than zero")
+    return seconds
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run the planet orbit simulation without a display.')
+    parser.add_argument('--years', type=positive_float, default=100, help='simulated years to run for')
+    parser.add_argument('--dt', type=parse_duration, default=3600.0, help='physics timestep, e.g. 1h')
+    parser.add_argument('--sample', type=parse_duration, default=10 * DAY, help='time between recorded samples, e.g. 10d')
+    parser.add_argument('--out', default=None, help='write sampled trajectories to this .npz file')
+    parser.add_argument('--db', default='Planets.db', help='database to load the bodies from')
+    parser.add_argument('--integrator', default='leapfrog', choices=sorted(integrators.INTEGRATORS))
+    parser.add_argument('--tolerance', type=float, default=1e-9, help='error tolerance of the adaptive integrator')
+    parser.add_argument('--solver', default='direct', choices=['direct', 'barneshut'])
+    parser.add_argument('--theta', type=float, default=0.5, help='Barnes-Hut opening angle')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    conn = sql.connect(args.db)
+    try:
+        for name, mass in schema.migrate(conn):
+            print(schema.unreadable_message(name, mass))
+        bodies = catalogue.load_bodies(conn)
+    except sql.OperationalError as e:
+        sys.exit(f"Could not load bodies from {args.db}: {e}")
+    finally:
+        conn.close()
+    if not bodies:
+        sys.exit(f"No bodies found in {args.db}")
+
+    system = catalogue.build_system(bodies)
+    if args.solver == 'barneshut':
+        system.solver = barneshut.BarnesHut(args.theta)
+    if args.integrator == 'adaptive':
+        integrator = integrators.create(args.integrator, tolerance=args.tolerance)
+    else:
+        integrator = integrators.create(args.integrator)
+
+    steps = int(round(args.years * YEAR / args.dt))
+    steps_per_sample = max(1, int(round(args.sample / args.dt)))
+    samples = -(-steps // steps_per_sample) + 1
+    times = np.zeros(samples)
+    positions = np.zeros((samples, len(system), 2))
+    velocities = np.zeros((samples, len(system), 2))
+    positions[0] = system.positions
+    velocities[0] = system.velocities
+
+    print(f"Simulating {len(system)} bodies for {args.years:g} years: {steps:,} steps of {args.dt:g} s with {args.integrator}")
+    start = time.perf_counter()
+    for sample in range(1, samples):
+        #The last sample may cover fewer steps
+        for _ in range(min(steps_per_sample, steps - (sample - 1) * steps_per_sample)):
+            integrator.step(system, args.dt)
+        times[sample] = system.time
+        positions[sample] = system.positions
+        velocities[sample] = system.velocities
+    elapsed = time.perf_counter() - start
+
+    rate = steps / elapsed if elapsed else float('inf')
+    print(f"{steps:,} steps in {elapsed:.2f} s: {rate:,.0f} steps per second, {rate * len(system):,.0f} body-steps per second")
+
+    if args.out:
+        names = np.array([body[0] for body in bodies])
+        np.savez(args.out, times=times, positions=positions, velocities=velocities, names=names, masses=system.masses)
+        print(f"Wrote {samples:,} samples to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
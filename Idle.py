@@ -0,0 +1,14 @@
+import pygame
+
+#Longest an idle loop sleeps before looking again, in milliseconds
+TIMEOUT = 500
+
+
+#Return the pending events, when wait is set block until one arrives (or the timeout passes) instead of spinning
+def poll(wait, timeout=TIMEOUT):
+    if not wait:
+        return pygame.event.get()
+    event = pygame.event.wait(timeout)
+    if event.type == pygame.NOEVENT:
+        return []
+    return [event] + pygame.event.get()
@@ -0,0 +1,164 @@
+import argparse
+import csv
+import json
+import math
+import sqlite3 as sql
+import sys
+import time
+import Catalogue as catalogue
+import Schema as schema
+
+#Rows validated and written per executemany call
+BATCH_SIZE = 10000
+#Invalid rows reported individually before only counting them
+MAX_REPORTED = 20
+
+#Columns of an imported body, positions in AU, velocities in km/s, mass in kg and orbital period in days
+COLUMNS = ['name', 'x', 'y', 'x_vel', 'y_vel', 'radiusscale', 'colour', 'mass', 'orbital_period']
+DEFAULTS = {'x_vel': 0, 'y_vel': 0, 'radiusscale': 0.1, 'colour': 'WHITE', 'orbital_period': 0}
+
+#Bodies that already exist keep their id, their position and properties are replaced
+INSERT_NAME = "INSERT OR IGNORE INTO celestial_bodies (name) VALUES (?)"
+INSERT_POSITION = """
+    INSERT OR REPLACE INTO position (celestial_body_id, x, y, x_vel, y_vel)
+    VALUES ((SELECT id FROM celestial_bodies WHERE name = ?), ?, ?, ?, ?)
+"""
+INSERT_PROPERTIES = """
+    INSERT OR REPLACE INTO physical_properties (celestial_body_id, radiusscale, colour, mass, orbital_period)
+    VALUES ((SELECT id FROM celestial_bodies WHERE name = ?), ?, ?, ?, ?)
+"""
+
+
+#Yield (line number, record) for each body in a CSV file with a header row or a JSON-lines file
+def read_records(path, format=None):
+    if format is None:
+        format = 'jsonl' if path.lower().endswith(('.jsonl', '.json')) else 'csv'
+    with open(path, newline='', encoding='utf-8') as file:
+        if format == 'csv':
+            reader = csv.DictReader(file)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, e
+
+
+#Turn a record into a row of COLUMNS, raises ValueError if it is not a valid body
+def validate(record):
+    if isinstance(record, Exception):
+        raise ValueError(f"not valid JSON: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("not an object")
+    values = {}
+    for column in COLUMNS:
+        value = record.get(column)
+        if value is None or value == '':
+            if column not in DEFAULTS:
+                raise ValueError(f"missing {column}")
+            value = DEFAULTS[column]
+        values[column] = value
+
+    name = str(values['name']).strip()
+    if not name:
+        raise ValueError("missing name")
+    try:
+        x, y, x_vel, y_vel, radiusscale, orbital_period = (
+            float(values[column]) for column in ('x', 'y', 'x_vel', 'y_vel', 'radiusscale', 'orbital_period'))
+        mass = catalogue.parse_mass(values['mass'])
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"not a number: {e}")
+    # nan and inf parse as floats but would poison every force in the simulation
+    for column, value in zip(('x', 'y', 'x_vel', 'y_vel', 'radiusscale', 'mass', 'orbital_period'), (x, y, x_vel, y_vel, radiusscale, mass, orbital_period)):
+        if not math.isfinite(value):
+            raise ValueError(f"{column} is not finite: {value}")
+    if mass < 0 or radiusscale < 0:
+        raise ValueError("mass and radius scale cannot be negative")
+    return name, x, y, x_vel, y_vel, radiusscale, str(values['colour']).strip().upper(), mass, orbital_period
+
+
+#Validate a batch of records, returns the valid rows and a list of (line number, reason) for the rest
+def validate_batch(batch):
+    rows = []
+    errors = []
+    for line_number, record in batch:
+        try:
+            rows.append(validate(record))
+        except ValueError as e:
+            errors.append((line_number, str(e)))
+    return rows, errors
+
+
+#Write a batch of valid rows into the three tables
+def write_batch(conn, rows):
+    conn.executemany(INSERT_NAME, [(row[0],) for row in rows])
+    conn.executemany(INSERT_POSITION, [row[0:5] for row in rows])
+    conn.executemany(INSERT_PROPERTIES, [(row[0],) + row[5:] for row in rows])
+
+
+#Stream records into the database in batches inside one transaction, returns (rows imported, invalid rows)
+def import_records(conn, records, batch_size=BATCH_SIZE, report=print):
+    for name, mass in schema.migrate(conn):
+        report(schema.unreadable_message(name, mass))
+    imported = 0
+    invalid = 0
+
+    def flush(batch):
+        nonlocal imported, invalid
+        rows, errors = validate_batch(batch)
+        write_batch(conn, rows)
+        imported += len(rows)
+        for line_number, reason in errors[:max(0, MAX_REPORTED - invalid)]:
+            report(f"line {line_number}: {reason}")
+        invalid += len(errors)
+
+    batch = []
+    conn.execute("BEGIN")
+    try:
+        for item in records:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        flush(batch)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return imported, invalid
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Import bodies from a CSV or JSON-lines file into the database.')
+    parser.add_argument('file', help='CSV with a header row or JSON lines, columns: ' + ', '.join(COLUMNS))
+    parser.add_argument('--db', default='Planets.db', help='database to import into')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default=None, help='file format, guessed from the extension by default')
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE, help='rows validated and written at once')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    conn = sql.connect(args.db)
+    start = time.perf_counter()
+    try:
+        imported, invalid = import_records(conn, read_records(args.file, args.format), max(1, args.batch))
+    except (OSError, sql.Error) as e:
+        sys.exit(f"Could not import {args.file}: {e}")
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - start
+
+    rate = imported / elapsed if elapsed else float('inf')
+    print(f"Imported {imported:,} bodies in {elapsed:.2f} s: {rate:,.0f} rows per second")
+    if invalid:
+        print(f"Skipped {invalid:,} invalid rows")
+
+
+if __name__ == '__main__':
+    main()
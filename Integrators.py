@@ -0,0 +1,182 @@
+import numpy as np
+
+
+#Base class, an integrator advances the whole system synchronously by one timestep
+class Integrator:
+    name = None
+
+    def step(self, system, dt):
+        self.advance(system, dt)
+        system.time += dt
+        system.update_distances()
+
+    def advance(self, system, dt):
+        raise NotImplementedError
+
+
+#Semi-implicit (symplectic) Euler, first order
+class SemiImplicitEuler(Integrator):
+    name = 'euler'
+
+    def advance(self, system, dt):
+        system.kick(dt)
+        system.drift(dt)
+
+
+#Kick-drift-kick leapfrog, second order, two force evaluations per step
+class Leapfrog(Integrator):
+    name = 'leapfrog'
+
+    def advance(self, system, dt):
+        system.kick(dt / 2)
+        system.drift(dt)
+        system.kick(dt / 2)
+
+
+#Velocity Verlet, second order, reuses the acceleration from the end of the previous step
+class VelocityVerlet(Integrator):
+    name = 'verlet'
+
+    def __init__(self):
+        self.acc = None
+        self.positions = None
+
+    def advance(self, system, dt):
+        #The cached acceleration is only valid if nothing has moved the bodies since the last step
+        if self.acc is None or self.positions is None or self.positions.shape != system.positions.shape \
+                or not np.array_equal(self.positions, system.positions):
+            self.acc = system.accelerations()
+
+        system.kick(dt / 2, self.acc)
+        system.drift(dt)
+        self.acc = system.accelerations()
+        system.kick(dt / 2, self.acc)
+        self.positions = system.positions.copy()
+
+
+#Yoshida's fourth order symplectic integrator, three force evaluations per step
+class Yoshida4(Integrator):
+    name = 'yoshida'
+
+    CBRT2 = 2 ** (1 / 3)
+    W1 = 1 / (2 - CBRT2)
+    W0 = -CBRT2 / (2 - CBRT2)
+    #Drift and kick coefficients
+    C = (W1 / 2, (W0 + W1) / 2, (W0 + W1) / 2, W1 / 2)
+    D = (W1, W0, W1)
+
+    def advance(self, system, dt):
+        for c, d in zip(self.C, self.D):
+            system.drift(c * dt)
+            system.kick(d * dt)
+        system.drift(self.C[-1] * dt)
+
+
+#Dormand-Prince embedded Runge-Kutta 5(4), picks its own substeps from a local error estimate
+class AdaptiveRK45(Integrator):
+    name = 'adaptive'
+
+    #Butcher tableau
+    A = (
+        (),
+        (1/5,),
+        (3/40, 9/40),
+        (44/45, -56/15, 32/9),
+        (19372/6561, -25360/2187, 64448/6561, -212/729),
+        (9017/3168, -355/33, 46732/5247, 49/176, -5103/18656),
+        (35/384, 0, 500/1113, 125/192, -2187/6784, 11/84),
+    )
+    #Fifth order weights minus fourth order weights, gives the error estimate
+    E = (71/57600, 0, -71/16695, 71/1920, -17253/339200, 22/525, -1/40)
+
+    #Limits on how much the substep can change at once
+    SAFETY = 0.9
+    MIN_FACTOR = 0.2
+    MAX_FACTOR = 5.0
+
+    def __init__(self, tolerance=1e-9):
+        #Maximum allowed error relative to the size of each position and velocity
+        self.tolerance = tolerance
+        self.h = None
+        #Statistics for the last call to step
+        self.steps = 0
+        self.rejected = 0
+        self.steps_per_day = 0.0
+
+    #Test particles are part of the state, so they also get a say in the substep size
+    def derivative(self, system, positions, velocities):
+        return velocities, system.state_accelerations(positions)
+
+    #Attempt one substep of size h, returns the new state and the scaled error
+    def attempt(self, system, positions, velocities, h):
+        kx = []
+        kv = []
+        for row in self.A:
+            x = positions.copy()
+            v = velocities.copy()
+            for a, dx, dv in zip(row, kx, kv):
+                if a:
+                    x += h * a * dx
+                    v += h * a * dv
+            dx, dv = self.derivative(system, x, v)
+            kx.append(dx)
+            kv.append(dv)
+
+        #The last stage is evaluated at the fifth order solution
+        new_positions, new_velocities = x, v
+        err_x = h * sum(e * dx for e, dx in zip(self.E, kx))
+        err_v = h * sum(e * dv for e, dv in zip(self.E, kv))
+
+        tiny = np.finfo(np.float64).tiny
+        scale_x = self.tolerance * np.maximum(np.abs(positions), np.abs(new_positions)) + tiny
+        scale_v = self.tolerance * np.maximum(np.abs(velocities), np.abs(new_velocities)) + tiny
+        error = max(np.max(np.abs(err_x) / scale_x, initial=0), np.max(np.abs(err_v) / scale_v, initial=0))
+        return new_positions, new_velocities, error
+
+    #Take one accepted substep no longer than max_h (if given), returns the size of the substep taken
+    def substep(self, system, min_h, max_h=None):
+        while True:
+            h = self.h if max_h is None else min(self.h, max_h)
+            positions, velocities, error = self.attempt(system, *system.state(), h)
+
+            #Grow or shrink the substep towards the tolerance
+            if error == 0:
+                factor = self.MAX_FACTOR
+            else:
+                factor = min(self.MAX_FACTOR, max(self.MIN_FACTOR, self.SAFETY * error ** -0.2))
+
+            if error <= 1 or h <= min_h:
+                system.set_state(positions, velocities)
+                #A substep cut short to land on max_h says nothing about the best size
+                if h == self.h or factor < 1:
+                    self.h = h * factor
+                return h
+
+            self.rejected += 1
+            self.h = h * factor
+
+    def advance(self, system, dt):
+        if self.h is None:
+            self.h = dt
+        remaining = dt
+        steps = 0
+        self.rejected = 0
+
+        while remaining > 0:
+            remaining -= self.substep(system, dt * 1e-12, remaining)
+            steps += 1
+
+        self.steps = steps
+        self.steps_per_day = steps / (dt / (3600 * 24))
+
+
+INTEGRATORS = {integrator.name: integrator for integrator in (SemiImplicitEuler, Leapfrog, VelocityVerlet, Yoshida4, AdaptiveRK45)}
+
+
+#Create an integrator from its name, options are passed on to its constructor
+def create(name, **options):
+    try:
+        integrator = INTEGRATORS[name]
+    except KeyError:
+        raise ValueError(f"Unknown integrator '{name}', choose from: {', '.join(INTEGRATORS)}")
+    return integrator(**options)
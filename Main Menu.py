@@ -3,6 +3,7 @@ import sys
 import Simulator as game
 import Database as database
 import sqlite3 as sql
+import Idle
 
 # Initialise database connection
 conn = sql.connect("Planets.db")
@@ -47,10 +48,16 @@ edit_button_rect = pygame.Rect(0, HEIGHT // 2 + 75, 550, 65)
 exit_button_rect = pygame.Rect(0, HEIGHT // 2 + 175, 500, 65)
 author_rect = pygame.Rect(0, HEIGHT - 50, 227, 30)
 
+# The menu is static, so it is only redrawn after events instead of every frame
+redraw = True
 # Game loop
 while True:
+    events = Idle.poll(not redraw)
+    if not events and not redraw:
+        continue
+    redraw = False
     #Event handling
-    for event in pygame.event.get():
+    for event in events:
         if event.type == pygame.QUIT:
             pygame.quit()
             sys.exit()
@@ -0,0 +1,56 @@
+import numpy as np
+
+
+#A swarm of massless test particles (asteroids, comets) stored as arrays and advanced with the system
+class ParticleSwarm:
+    def __init__(self, positions, velocities, colour=(114, 136, 151), name='Particles'):
+        self.positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2).copy()
+        self.velocities = np.asarray(velocities, dtype=np.float64).reshape(-1, 2).copy()
+        self.colour = colour
+        self.name = name
+
+    def __len__(self):
+        return len(self.positions)
+
+    def copy(self):
+        return ParticleSwarm(self.positions, self.velocities, self.colour, self.name)
+
+    #Place particles on Keplerian orbits around a central body from their orbital elements
+    #a: semi-major axis (m), e: eccentricity, omega: argument of periapsis, mean_anomaly: position along the orbit
+    #sense is 1 for anticlockwise orbits and -1 for clockwise ones
+    @classmethod
+    def from_elements(cls, system, central_index, a, e, omega, mean_anomaly, sense=1, **kwargs):
+        a, e, omega, mean_anomaly = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (a, e, omega, mean_anomaly)))
+        mu = system.G * system.masses[central_index]
+
+        #Solve Kepler's equation E - e sin E = M with Newton's method
+        E = np.where(e < 0.8, mean_anomaly, np.pi)
+        for _ in range(30):
+            delta = (E - e * np.sin(E) - mean_anomaly) / (1 - e * np.cos(E))
+            E -= delta
+            if np.max(np.abs(delta), initial=0) < 1e-12:
+                break
+
+        #Position and velocity in the orbital plane, periapsis along the x axis
+        b = a * np.sqrt(1 - e ** 2)
+        E_dot = np.sqrt(mu / a ** 3) / (1 - e * np.cos(E))
+        x = a * (np.cos(E) - e)
+        y = b * np.sin(E) * sense
+        x_vel = -a * np.sin(E) * E_dot
+        y_vel = b * np.cos(E) * E_dot * sense
+
+        #Rotate by the argument of periapsis and move to the central body
+        cos_w, sin_w = np.cos(omega), np.sin(omega)
+        positions = np.column_stack((x * cos_w - y * sin_w, x * sin_w + y * cos_w)) + system.positions[central_index]
+        velocities = np.column_stack((x_vel * cos_w - y_vel * sin_w, x_vel * sin_w + y_vel * cos_w)) + system.velocities[central_index]
+        return cls(positions, velocities, **kwargs)
+
+    #Seed a population with elements drawn uniformly from the given ranges
+    @classmethod
+    def seed(cls, system, central_index, count, a_range, e_range, sense=1, rng=None, **kwargs):
+        rng = np.random.default_rng(rng)
+        a = rng.uniform(*a_range, count)
+        e = rng.uniform(*e_range, count)
+        omega = rng.uniform(0, 2 * np.pi, count)
+        mean_anomaly = rng.uniform(0, 2 * np.pi, count)
+        return cls.from_elements(system, central_index, a, e, omega, mean_anomaly, sense, **kwargs)
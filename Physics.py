@@ -0,0 +1,186 @@
+import numpy as np
+
+#Gravitational constant
+G = 6.67428e-11
+
+#Rows of the pairwise displacement matrix handled at once, keeps memory bounded for large systems
+BLOCK_SIZE = 1024
+
+
+#Calculate the acceleration of every body due to every other body using Newton's law of universal gravitation
+def accelerations(positions, masses, G=G):
+    positions = np.asarray(positions, dtype=np.float64)
+    masses = np.asarray(masses, dtype=np.float64)
+    acc = np.zeros_like(positions)
+
+    for start in range(0, len(positions), BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, len(positions))
+        #Displacement vectors from each body in the block to every body
+        d = positions[np.newaxis, :, :] - positions[start:stop, np.newaxis, :]
+        dist_sq = np.einsum('ijk,ijk->ij', d, d)
+        #A body does not attract itself, nor does another body sitting exactly on top of it
+        dist_sq[dist_sq == 0] = np.inf
+        #G * m / r^2 along the unit vector d / r, so m / r^3 times the displacement
+        weights = masses[np.newaxis, :] * dist_sq ** -1.5
+        acc[start:stop] = G * np.einsum('ij,ijk->ik', weights, d)
+
+    return acc
+
+
+#Calculate the acceleration at each target position due to the source bodies, the targets exert no force themselves
+def field_accelerations(targets, sources, masses, G=G):
+    targets = np.asarray(targets, dtype=np.float64)
+    sources = np.asarray(sources, dtype=np.float64)
+    masses = np.asarray(masses, dtype=np.float64)
+    acc = np.zeros_like(targets)
+
+    for start in range(0, len(targets), BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, len(targets))
+        d = sources[np.newaxis, :, :] - targets[start:stop, np.newaxis, :]
+        dist_sq = np.einsum('ijk,ijk->ij', d, d)
+        #A target sitting exactly on a source feels nothing from it
+        dist_sq[dist_sq == 0] = np.inf
+        weights = masses[np.newaxis, :] * dist_sq ** -1.5
+        acc[start:stop] = G * np.einsum('ij,ijk->ik', weights, d)
+
+    return acc
+
+
+#Calculate the distance of every body from one body, e.g. the sun
+def distances_to(positions, index):
+    positions = np.asarray(positions, dtype=np.float64)
+    d = positions - positions[index]
+    return np.hypot(d[:, 0], d[:, 1])
+
+
+#Holds the state of every body in contiguous arrays, one row per body
+class BodySystem:
+    def __init__(self, G=G, solver=accelerations):
+        self.G = G
+        #Force backend, called with (positions, masses, G), e.g. direct summation or Barnes-Hut
+        self.solver = solver
+        self.positions = np.zeros((0, 2), dtype=np.float64)
+        self.velocities = np.zeros((0, 2), dtype=np.float64)
+        self.masses = np.zeros(0, dtype=np.float64)
+        #Fixed bodies (e.g. the sun) attract others but are never moved
+        self.fixed = np.zeros(0, dtype=bool)
+        self.distance_to_sun = np.zeros(0, dtype=np.float64)
+        self.sun_index = None
+        #Simulated time in seconds
+        self.time = 0.0
+        #Positions to draw, set when drawing is interpolated between physics steps
+        self.render_positions = None
+        #Swarms of massless test particles that feel the bodies but do not attract anything
+        self.particles = []
+
+    def __len__(self):
+        return len(self.masses)
+
+    #Add a body and return the index of its row
+    def add_body(self, x, y, mass, x_vel=0, y_vel=0, fixed=False):
+        return self.add_bodies([(x, y)], [(x_vel, y_vel)], [mass], [fixed]).start
+
+    #Add many bodies at once, each array is grown a single time, returns the range of their rows
+    def add_bodies(self, positions, velocities, masses, fixed=None):
+        start = len(self)
+        masses = np.asarray(masses, dtype=np.float64).reshape(-1)
+        if fixed is None:
+            fixed = np.zeros(len(masses), dtype=bool)
+        self.positions = np.concatenate((self.positions, np.asarray(positions, dtype=np.float64).reshape(-1, 2)))
+        self.velocities = np.concatenate((self.velocities, np.asarray(velocities, dtype=np.float64).reshape(-1, 2)))
+        self.masses = np.concatenate((self.masses, masses))
+        self.fixed = np.concatenate((self.fixed, np.asarray(fixed, dtype=bool)))
+        self.distance_to_sun = np.concatenate((self.distance_to_sun, np.zeros(len(masses))))
+        return range(start, len(self))
+
+    #Mark a body as the sun, distances are measured from it and it is held in place
+    def set_sun(self, index):
+        self.sun_index = index
+        self.fixed[index] = True
+        self.velocities[index] = 0
+
+    #Calculate the acceleration of every body (optionally at trial positions), fixed bodies do not accelerate
+    def accelerations(self, positions=None):
+        if positions is None:
+            positions = self.positions
+        acc = self.solver(positions, self.masses, self.G)
+        acc[self.fixed] = 0
+        return acc
+
+    #Calculate the distance of every body to the sun
+    def update_distances(self):
+        if self.sun_index is not None:
+            self.distance_to_sun = distances_to(self.positions, self.sun_index)
+
+    #Calculate the acceleration of every test particle in a swarm
+    def particle_accelerations(self, swarm, positions=None, body_positions=None):
+        if positions is None:
+            positions = swarm.positions
+        if body_positions is None:
+            body_positions = self.positions
+        return field_accelerations(positions, body_positions, self.masses, self.G)
+
+    #Move every body and test particle along its velocity
+    def drift(self, dt):
+        self.positions += self.velocities * dt
+        for swarm in self.particles:
+            swarm.positions += swarm.velocities * dt
+
+    #Change the velocity of every body using the given (or freshly calculated) accelerations, test particles always use fresh ones
+    def kick(self, dt, acc=None):
+        for swarm in self.particles:
+            swarm.velocities += self.particle_accelerations(swarm) * dt
+        if acc is None:
+            acc = self.accelerations()
+        self.velocities += acc * dt
+
+    #Positions and velocities of every body followed by every test particle, stacked into single arrays
+    def state(self):
+        if not self.particles:
+            return self.positions, self.velocities
+        positions = np.vstack([self.positions] + [swarm.positions for swarm in self.particles])
+        velocities = np.vstack([self.velocities] + [swarm.velocities for swarm in self.particles])
+        return positions, velocities
+
+    #Unpack stacked arrays from state() back into the bodies and test particles
+    def set_state(self, positions, velocities):
+        start = len(self)
+        self.positions = positions[:start]
+        self.velocities = velocities[:start]
+        for swarm in self.particles:
+            stop = start + len(swarm)
+            swarm.positions = positions[start:stop]
+            swarm.velocities = velocities[start:stop]
+            start = stop
+
+    #Accelerations for stacked positions from state()
+    def state_accelerations(self, positions):
+        n = len(self)
+        acc = np.empty_like(positions)
+        acc[:n] = self.accelerations(positions[:n])
+        if len(positions) > n:
+            acc[n:] = field_accelerations(positions[n:], positions[:n], self.masses, self.G)
+        return acc
+
+    #Return an independent copy of the system
+    def copy(self):
+        system = BodySystem(self.G, self.solver)
+        system.restore(self.snapshot())
+        system.sun_index = self.sun_index
+        system.time = self.time
+        system.particles = [swarm.copy() for swarm in self.particles]
+        return system
+
+    #Return a copy of the state arrays
+    def snapshot(self):
+        return (self.positions.copy(), self.velocities.copy(), self.masses.copy(),
+                self.fixed.copy(), self.distance_to_sun.copy())
+
+    #Replace the state arrays with a snapshot
+    def restore(self, snapshot):
+        positions, velocities, masses, fixed, distance_to_sun = snapshot
+        self.positions = positions.copy()
+        self.velocities = velocities.copy()
+        self.masses = masses.copy()
+        self.fixed = fixed.copy()
+        self.distance_to_sun = distance_to_sun.copy()
@@ -0,0 +1,104 @@
+import json
+import os
+import numpy as np
+
+#Frames added to the files each time they fill up
+CHUNK = 1024
+#Frames between writes of the frame count, a crash loses at most this many frames
+FLUSH_FRAMES = 256
+
+
+#Body positions sampled over simulated time, kept in memory-mapped files so long recordings use the OS page cache rather than RAM
+#<path>.positions holds float64 frames of (bodies, 2), <path>.times the simulated time of each frame and <path>.json the body names and frame count
+class Trajectory:
+    #Open a recording to append to, names are the recorded bodies in row order
+    #An existing recording of the same bodies is continued, otherwise a new one is started
+    def __init__(self, path, names=None):
+        self.path = path
+        self.writable = names is not None
+        meta = self.read_meta()
+        if not self.writable:
+            if meta is None:
+                raise FileNotFoundError(f"No recording at {path}")
+            names = meta['names']
+        self.names = list(names)
+        self.bodies = len(self.names)
+        self.frames = meta['frames'] if meta is not None and meta['names'] == self.names else 0
+        self.capacity = 0
+        self.positions = None
+        self.times = None
+        if self.writable:
+            self.map(max(CHUNK, -(-self.frames // CHUNK) * CHUNK))
+        elif self.frames:
+            self.map(self.frames)
+
+    def __len__(self):
+        return self.frames
+
+    def read_meta(self):
+        try:
+            with open(self.path + '.json') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    #Map the files with room for capacity frames, growing them first if writing
+    def map(self, capacity):
+        self.positions = self.times = None
+        mode = 'r'
+        if self.writable:
+            mode = 'r+'
+            for suffix, frame_size in (('.positions', self.bodies * 2 * 8), ('.times', 8)):
+                with open(self.path + suffix, 'ab'):
+                    pass
+                os.truncate(self.path + suffix, capacity * frame_size)
+        self.positions = np.memmap(self.path + '.positions', dtype=np.float64, mode=mode, shape=(capacity, self.bodies, 2))
+        self.times = np.memmap(self.path + '.times', dtype=np.float64, mode=mode, shape=(capacity,))
+        self.capacity = capacity
+
+    #Add a frame, if the time is not after the last frame (e.g. the simulation was restarted) the frames from then on are replaced
+    def append(self, time, positions):
+        if self.frames and time <= self.times[self.frames - 1]:
+            self.frames = int(np.searchsorted(self.times[:self.frames], time))
+        if self.frames == self.capacity:
+            self.flush()
+            self.map(self.capacity + CHUNK)
+        self.positions[self.frames] = positions[:self.bodies]
+        self.times[self.frames] = time
+        self.frames += 1
+        if self.frames % FLUSH_FRAMES == 0:
+            self.flush()
+
+    #Write the frames to disk and record how many there are, written next to the old file and swapped in
+    def flush(self):
+        if not self.writable:
+            return
+        self.positions.flush()
+        self.times.flush()
+        with open(self.path + '.json.tmp', 'w') as file:
+            json.dump({'names': self.names, 'frames': self.frames}, file)
+        os.replace(self.path + '.json.tmp', self.path + '.json')
+
+    @property
+    def start_time(self):
+        return float(self.times[0]) if self.frames else 0.0
+
+    @property
+    def end_time(self):
+        return float(self.times[self.frames - 1]) if self.frames else 0.0
+
+    #Positions at a simulated time, interpolated between the frames either side of it
+    def positions_at(self, time):
+        times = self.times[:self.frames]
+        index = int(np.searchsorted(times, time))
+        if index <= 0:
+            return np.array(self.positions[0])
+        if index >= self.frames:
+            return np.array(self.positions[self.frames - 1])
+        before, after = times[index - 1], times[index]
+        alpha = (time - before) / (after - before)
+        return self.positions[index - 1] + alpha * (self.positions[index] - self.positions[index - 1])
+
+    def close(self):
+        self.flush()
+        self.positions = self.times = None
@@ -0,0 +1,119 @@
+import pygame
+
+
+#Merge overlapping rectangles so no pixel is restored or sent to the display twice
+def merge(rects):
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        #Growing a rectangle can make it overlap ones already merged, so keep going until it overlaps nothing
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+#Draws each frame over cached static and trail layers and only sends the parts of the window that changed to the display
+class Renderer:
+    #When more than this fraction of the window has changed one full update is cheaper than many small ones
+    FULL_UPDATE_FRACTION = 0.5
+    #Colour left out when the trail layer is drawn over the static layer
+    TRAIL_KEY = (0, 0, 0)
+    #Trail segments added between full redraws of the trail layer, so points that have aged out of the trails disappear
+    TRAIL_REDRAW_SEGMENTS = 2048
+
+    def __init__(self, win):
+        self.win = win
+        #Background and interface chrome that rarely change, drawn by the caller's draw_static function
+        self.static = None
+        self.static_dirty = True
+        #Orbit trails, redrawn in full only when the view changes and extended one segment at a time otherwise
+        self.trails = None
+        self.trails_dirty = True
+        #View the trail layer was drawn for, drawing it again is needed when this changes
+        self.trails_key = None
+        self.trail_segments = 0
+        #Whether the whole window has to be redrawn this frame
+        self.full = True
+        #Rectangles drawn over the static layer last frame and this frame
+        self.previous = []
+        self.current = []
+
+    #Force a full redraw next frame, rebuilding the static or trail layer as well if it has changed
+    def invalidate(self, static=False, trails=False):
+        self.full = True
+        if static:
+            self.static_dirty = True
+        if trails:
+            self.trails_dirty = True
+
+    #Start a frame by restoring the static and trail layers wherever something was drawn last frame
+    #draw_trails draws every trail onto the trail layer, it is called again whenever trails_key changes
+    def begin(self, draw_static, draw_trails=None, trails_key=None):
+        size = self.win.get_size()
+        if self.static is None or self.static.get_size() != size:
+            self.static = pygame.Surface(size)
+            self.static_dirty = True
+            self.trails = pygame.Surface(size)
+            self.trails.set_colorkey(self.TRAIL_KEY)
+            self.trails_dirty = True
+        if self.static_dirty:
+            draw_static(self.static)
+            self.static_dirty = False
+            self.full = True
+        if self.trail_segments >= self.TRAIL_REDRAW_SEGMENTS or trails_key != self.trails_key:
+            self.trails_dirty = True
+        if self.trails_dirty:
+            self.trails.fill(self.TRAIL_KEY)
+            if draw_trails is not None:
+                draw_trails(self.trails)
+            self.trails_key = trails_key
+            self.trails_dirty = False
+            self.trail_segments = 0
+            self.full = True
+
+        if self.full:
+            self.win.blit(self.static, (0, 0))
+            self.win.blit(self.trails, (0, 0))
+        else:
+            for rect in self.previous:
+                self.win.blit(self.static, rect, rect)
+                self.win.blit(self.trails, rect, rect)
+
+    #Extend the trail layer, draw is called with the trail layer and then the window and returns the rectangle drawn on or None
+    def extend_trails(self, draw):
+        rects = [draw(self.trails)]
+        if rects[0] is None:
+            return
+        rects.append(draw(self.win))
+        self.trail_segments += 1
+        self.mark(rects)
+
+    #Record rectangles that have been drawn on this frame, accepts Rects, lists of Rects and None
+    def mark(self, *rects):
+        bounds = self.win.get_rect()
+        for rect in rects:
+            if rect is None:
+                continue
+            if isinstance(rect, list):
+                self.mark(*rect)
+                continue
+            # one pixel of slack for line ends
+            rect = pygame.Rect(rect).inflate(2, 2).clip(bounds)
+            if rect.width and rect.height:
+                self.current.append(rect)
+
+    #Finish a frame by updating only what changed since the last one
+    def end(self):
+        width, height = self.win.get_size()
+        self.current = merge(self.current)
+        changed = merge(self.previous + self.current)
+        if self.full or sum(rect.width * rect.height for rect in changed) > self.FULL_UPDATE_FRACTION * width * height:
+            pygame.display.update()
+        else:
+            pygame.display.update(changed)
+        self.previous = self.current
+        self.current = []
+        self.full = False
@@ -0,0 +1,93 @@
+import time
+
+DAY = 3600 * 24
+
+
+#Runs a fixed physics timestep at a rate set in simulated days per wall-clock second, independent of the frame rate
+class FixedStepScheduler:
+    def __init__(self, system, integrator, timestep, days_per_second, max_substeps=10000, max_wall_time=0.25, budget=0.1):
+        self.system = system
+        self.integrator = integrator
+        #Seconds of simulated time per physics step
+        self.timestep = timestep
+        self.days_per_second = days_per_second
+        #Upper bound on physics steps per frame
+        self.max_substeps = max_substeps
+        #Longest wall-clock time one call catches up on, so a slow frame does not leave the next one owing even more steps
+        self.max_wall_time = max_wall_time
+        #Wall-clock seconds one call may spend stepping, time still owed after that is dropped so a stall cannot freeze the window
+        self.budget = budget
+        #Simulated seconds owed to the physics
+        self.accumulator = 0.0
+        self.previous_positions = system.positions.copy()
+        #Fraction of a step between the previous and current state, used for drawing
+        self.alpha = 1.0
+        self.substeps = 0
+
+    #Size of the next physics step, an adaptive integrator picks its own and carries it from one frame to the next
+    def next_step(self):
+        if not hasattr(self.integrator, 'substep'):
+            return self.timestep
+        if self.integrator.h is None:
+            self.integrator.h = self.timestep
+        return self.integrator.h
+
+    #Advance the physics for the wall-clock time that has passed and return the number of steps taken
+    def advance(self, wall_time):
+        self.accumulator += min(wall_time, self.max_wall_time) * self.days_per_second * DAY
+        if hasattr(self.integrator, 'substep'):
+            return self.advance_adaptive()
+
+        deadline = time.perf_counter() + self.budget
+        steps = 0
+        while self.accumulator >= self.timestep:
+            if steps == self.max_substeps or time.perf_counter() > deadline:
+                #Drop the time we cannot catch up on rather than taking coarser steps
+                self.accumulator %= self.timestep
+                break
+            #Only the state before the last step is needed for interpolation
+            self.previous_positions = self.system.positions.copy()
+            self.integrator.step(self.system, self.timestep)
+            self.accumulator -= self.timestep
+            steps += 1
+
+        self.alpha = self.accumulator / self.timestep
+        self.substeps = steps
+        self.system.render_positions = self.interpolated_positions()
+        return steps
+
+    #Take whole steps of the size the integrator asks for, so quiet systems are not held to the fixed timestep
+    def advance_adaptive(self):
+        integrator = self.integrator
+        integrator.rejected = 0
+        steps = 0
+        elapsed = 0.0
+        deadline = time.perf_counter() + self.budget
+        while self.accumulator >= self.next_step():
+            if steps == self.max_substeps or time.perf_counter() > deadline:
+                #Drop the time we cannot catch up on
+                self.accumulator = 0.0
+                break
+            self.previous_positions = self.system.positions.copy()
+            h = integrator.substep(self.system, self.timestep * 1e-12)
+            self.system.time += h
+            self.accumulator -= h
+            elapsed += h
+            steps += 1
+
+        if steps:
+            self.system.update_distances()
+            integrator.steps = steps
+            integrator.steps_per_day = steps / (elapsed / DAY)
+        #The accumulator is always less than the next step, so drawing lags by at most one step
+        self.alpha = max(0.0, self.accumulator) / self.next_step()
+        self.substeps = steps
+        self.system.render_positions = self.interpolated_positions()
+        return steps
+
+    #Positions to draw, interpolated between the last two physics states
+    def interpolated_positions(self):
+        current = self.system.positions
+        if self.previous_positions.shape != current.shape:
+            return current
+        return self.previous_positions + self.alpha * (current - self.previous_positions)
@@ -0,0 +1,194 @@
+import Catalogue as catalogue
+
+#Version of the newest schema, stored in the database with PRAGMA user_version
+#0: original tables, mass stored as text
+#1: initial velocity columns on position
+#2: mass stored as REAL, one position and physical_properties row per body, indexed by celestial_body_id
+#3: body_changes log filled in by triggers, read by the simulator to reload edited bodies
+SCHEMA_VERSION = 3
+
+TABLES = """
+    CREATE TABLE celestial_bodies (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE
+    );
+    CREATE TABLE position (
+        celestial_body_id INTEGER,
+        x REAL,
+        y REAL,
+        x_vel REAL DEFAULT 0,
+        y_vel REAL DEFAULT 0,
+        FOREIGN KEY(celestial_body_id) REFERENCES celestial_bodies(id)
+    );
+    CREATE TABLE physical_properties (
+        celestial_body_id INTEGER,
+        radiusscale REAL,
+        colour TEXT,
+        mass REAL,
+        orbital_period REAL,
+        FOREIGN KEY(celestial_body_id) REFERENCES celestial_bodies(id)
+    );
+"""
+
+#Unique indexes make the joins on celestial_body_id lookups and stop a body having two rows
+INDEXES = """
+    CREATE UNIQUE INDEX IF NOT EXISTS position_body ON position (celestial_body_id);
+    CREATE UNIQUE INDEX IF NOT EXISTS physical_properties_body ON physical_properties (celestial_body_id);
+"""
+
+#Every insert, update or delete of a body records its id with a new seq, one row per body so the log stays small
+#Statements are run one at a time as the trigger bodies contain semicolons
+CHANGE_LOG = [
+    """
+    CREATE TABLE IF NOT EXISTS body_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        celestial_body_id INTEGER UNIQUE
+    )
+    """,
+] + [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()} AFTER {event} ON {table}
+    BEGIN
+        INSERT OR REPLACE INTO body_changes (celestial_body_id) VALUES ({row}.{column});
+    END
+    """
+    for table, column in [('position', 'celestial_body_id'), ('physical_properties', 'celestial_body_id')]
+    for event, row in [('INSERT', 'NEW'), ('UPDATE', 'NEW')]
+] + [
+    """
+    CREATE TRIGGER IF NOT EXISTS celestial_bodies_delete AFTER DELETE ON celestial_bodies
+    BEGIN
+        INSERT OR REPLACE INTO body_changes (celestial_body_id) VALUES (OLD.id);
+    END
+    """,
+]
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def table_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+#Run each statement of a script inside the current transaction, executescript would commit it first
+def execute_script(conn, script):
+    for statement in script.split(';'):
+        if statement.strip():
+            conn.execute(statement)
+
+
+#Add the initial velocity columns, filled in from the values that used to be hard-coded
+def add_velocities(conn):
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(position)")]
+    if 'x_vel' not in columns:
+        conn.execute("ALTER TABLE position ADD COLUMN x_vel REAL DEFAULT 0")
+    if 'y_vel' not in columns:
+        conn.execute("ALTER TABLE position ADD COLUMN y_vel REAL DEFAULT 0")
+        conn.executemany("""
+            UPDATE position SET y_vel = ?
+            WHERE celestial_body_id = (SELECT id FROM celestial_bodies WHERE name = ?)
+        """, [(y_vel, name) for name, y_vel in catalogue.INITIAL_Y_VELOCITIES.items()])
+
+
+#Convert a mass from an old database to kg, None if it cannot be read
+def legacy_mass(value):
+    if value is None:
+        return None
+    try:
+        return catalogue.parse_mass(value if isinstance(value, (int, float)) else str(value))
+    except ValueError:
+        return None
+
+
+#Message for a mass a migration could not read, for the caller of migrate to report
+def unreadable_message(name, mass):
+    return f"Could not read the mass of {name} ({mass!r}), it has been left empty, set it in the database editor"
+
+
+#Store mass as a number and index celestial_body_id, keeping the newest row where a body has several
+#Masses that cannot be read are left empty instead of stopping the upgrade, returns them as (name, mass)
+def numeric_mass(conn):
+    rows = conn.execute("""
+        SELECT celestial_body_id, radiusscale, colour, mass, orbital_period FROM physical_properties
+        WHERE rowid IN (SELECT MAX(rowid) FROM physical_properties GROUP BY celestial_body_id)
+    """).fetchall()
+    unreadable = []
+    converted = []
+    for id, radiusscale, colour, mass, orbital_period in rows:
+        value = legacy_mass(mass)
+        if value is None:
+            unreadable.append((id, mass))
+        converted.append((id, radiusscale, colour, value, orbital_period))
+
+    # SQLite cannot change a column's type, so physical_properties is copied into a new table
+    execute_script(conn, """
+        CREATE TABLE physical_properties_new (
+            celestial_body_id INTEGER,
+            radiusscale REAL,
+            colour TEXT,
+            mass REAL,
+            orbital_period REAL,
+            FOREIGN KEY(celestial_body_id) REFERENCES celestial_bodies(id)
+        );
+        DROP TABLE physical_properties;
+        ALTER TABLE physical_properties_new RENAME TO physical_properties;
+        DELETE FROM position WHERE rowid NOT IN (SELECT MAX(rowid) FROM position GROUP BY celestial_body_id);
+    """)
+    conn.executemany("""
+        INSERT INTO physical_properties (celestial_body_id, radiusscale, colour, mass, orbital_period) VALUES (?, ?, ?, ?, ?)
+    """, converted)
+    execute_script(conn, INDEXES)
+
+    names = []
+    for id, mass in unreadable:
+        name = conn.execute("SELECT name FROM celestial_bodies WHERE id = ?", (id,)).fetchone()
+        names.append((name[0] if name else f'body {id}', mass))
+    return names
+
+
+#Log which bodies change so a running simulation can reload just those
+def add_change_log(conn):
+    for statement in CHANGE_LOG:
+        conn.execute(statement)
+
+
+#Each migration upgrades the schema from the version before it
+MIGRATIONS = {
+    1: add_velocities,
+    2: numeric_mass,
+    3: add_change_log,
+}
+
+
+#Create the newest schema in an empty database
+def create(conn):
+    conn.executescript(TABLES + INDEXES)
+    add_change_log(conn)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+
+
+#Upgrade a database in place to the newest schema
+#Returns (name, mass) of every mass that could not be read and was left empty, the caller reports them with unreadable_message
+def migrate(conn):
+    version = get_version(conn)
+    if not table_exists(conn, 'celestial_bodies'):
+        create(conn)
+        return []
+    if version >= SCHEMA_VERSION:
+        return []
+
+    unreadable = []
+    conn.commit()
+    conn.execute("BEGIN")
+    try:
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            unreadable += MIGRATIONS[target](conn) or []
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return unreadable
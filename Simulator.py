@@ -6,7 +6,26 @@ import random
 import threading
 import sqlite3 as sql
 import Database as database
+import Catalogue as catalogue
+import Schema as schema
+import Physics as physics
+import Integrators as integrators
+import Scheduler as scheduling
+import Worker as workers
+import BarnesHut as barneshut
+import Particles as particles
+import Trails as trails
+import Camera
+import TextCache
+import Renderer
+import Idle
+import Watcher as watching
+import Checkpoint as checkpoint
+import Recording as recordings
+import time
+import queue
 import os
+import numpy as np
 
 #Initialise pygame and music
 pygame.init()
@@ -16,8 +35,8 @@ pygame.mixer.music.load('englishsunshine.mp3')
 #Set up display
 WIDTH, HEIGHT = 1200, 800
 WIN = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
-WIN_CENTRE = Vector2(WIDTH // 2, HEIGHT // 2)
-WCENTRE, HCENTRE = WIN_CENTRE
+#The camera owns the zoom and pan, the world origin starts in the middle of the window
+camera = Camera.Camera(250 / catalogue.AU, WIDTH, HEIGHT)  #arbritary scale
 
 #Set up caption and icon
 pygame.display.set_caption('PlanetOrbit')
@@ -40,15 +59,50 @@ colour_mapping = {
     'LIGHT_SPACE': (114, 136, 151),
 }
 
-#Set up font
+#Set up font and a cache of rendered text
 FONT = pygame.font.SysFont('arial', 16)
+text_cache = TextCache.TextCache()
 
 #Set up variables
-default = 1
+days_per_second = 60
 details = False
 show_orbit = True
 show_stars = True
 show_lebron = False
+#Integration scheme, one of euler, leapfrog, verlet, yoshida or adaptive
+integrator_name = os.environ.get('PLANETORBIT_INTEGRATOR', 'leapfrog')
+#Error tolerance used by the adaptive integrator instead of a fixed step
+tolerance = float(os.environ.get('PLANETORBIT_TOLERANCE', 1e-9))
+#Force solver, direct summation or barneshut for large numbers of bodies
+solver_name = os.environ.get('PLANETORBIT_SOLVER', 'direct')
+#Barnes-Hut opening angle and the body count below which it falls back to direct summation
+theta = float(os.environ.get('PLANETORBIT_THETA', 0.5))
+solver_threshold = int(os.environ.get('PLANETORBIT_SOLVER_THRESHOLD', 256))
+#Number of massless asteroids (main belt) and comets to seed around the sun
+asteroid_count = int(os.environ.get('PLANETORBIT_ASTEROIDS', 0))
+comet_count = int(os.environ.get('PLANETORBIT_COMETS', 0))
+#Simulated time covered by each orbit trail and between its full resolution points
+trail_duration = float(os.environ.get('PLANETORBIT_TRAIL_YEARS', 200)) * 365.25 * 3600 * 24
+trail_interval = float(os.environ.get('PLANETORBIT_TRAIL_INTERVAL_DAYS', 1)) * 3600 * 24
+#Change in scale (pixels per metre) and planet radius per zoom notch, as the nine original bodies used to give between them
+ZOOM_STEP = 9 / catalogue.AU
+RADIUS_STEP = 9 * 0.05
+#Run the physics on a background thread instead of between frames
+threaded_physics = os.environ.get('PLANETORBIT_WORKER', '0') == '1'
+#File the simulation is saved to on exit and resumed from on start, empty to always start from the database
+checkpoint_path = os.environ.get('PLANETORBIT_CHECKPOINT', checkpoint.DEFAULT_PATH)
+#Seconds to wait for the physics thread to hand over a copy of the system to save, the save is skipped after that
+CHECKPOINT_TIMEOUT = 2
+#Simulated years between automatic saves, 0 to only save on exit
+autosave_interval = float(os.environ.get('PLANETORBIT_AUTOSAVE_YEARS', 10)) * 365.25 * 3600 * 24
+#Files body positions are recorded to for replay (.positions, .times and .json are added to it), empty to not record
+record_path = os.environ.get('PLANETORBIT_RECORD', '')
+#Simulated days between recorded frames
+record_interval = float(os.environ.get('PLANETORBIT_RECORD_INTERVAL_DAYS', 1)) * 3600 * 24
+#Start by replaying the recording instead of simulating
+start_in_replay = os.environ.get('PLANETORBIT_REPLAY', '0') == '1'
+#Whether the recording is being replayed, the physics is paused meanwhile
+replaying = False
 
 
 
@@ -57,118 +111,143 @@ class Planet:
     #Physics constants
     AU = 149.6e6 *1000
     G = 6.67428e-11
-    SCALE = 250 / AU  #arbritary scale
-    TIMESTEP = 3600*24 / default# days per frame
-                                # 1 = 1 day per frame = 60 days per second
-                                # 30 = 1/30th of a day per frame = 2 days per second
-                                # 60 = 1/60th of a day per frame = 1 day per second
+    TIMESTEP = 3600*6 # seconds of simulated time per physics step
+                      # the slider sets how many days are simulated per second,
+                      # which decides how many steps run each frame
     EarthRadius = 16 #Arbitrary radius of earth 
     pause = False
 
-    def __init__(self, x, y, radiusScale, colour, mass, orbital_period, name, imagepath = None):
-        self.x = x
-        self.y = y
+    __slots__ = ('system', 'index', 'radiusScale', 'colour', 'orbital_period', 'name', 'imagepath', 'orbit', 'trail_version', 'loop_counter')
+
+    def __init__(self, system, x, y, radiusScale, colour, mass, orbital_period, name, imagepath = None, index = None):
+        #The planet is a view onto one row of the system's arrays, a new row is added unless an existing one is given
+        self.system = system
+        self.index = system.add_body(x, y, mass) if index is None else index
         #Radius of planet as a ratio of earth's radius
         self.radiusScale = radiusScale
         self.colour = colour
-        self.mass = mass
         self.orbital_period = orbital_period
         self.name = name
         self.imagepath = imagepath
 
-        self.orbit = []
-        self.sun = False
-        self.distance_to_sun = 0
-
-        self.x_vel = 0
-        self.y_vel = 0
+        self.orbit = trails.Trail(trail_duration, trail_interval)
+        #Trail version last drawn on the renderer's trail layer
+        self.trail_version = None
 
         self.loop_counter = 0
-    
-    #Render the planet and orbit on the window
-    def draw(self, win):
-        x = self.x * self.SCALE + WCENTRE
-        y = self.y * self.SCALE + HCENTRE
-        radius = self.radiusScale * self.EarthRadius
 
-        #Render orbit lines
+    @property
+    def x(self):
+        return self.system.positions[self.index, 0]
+
+    @x.setter
+    def x(self, value):
+        self.system.positions[self.index, 0] = value
+
+    @property
+    def y(self):
+        return self.system.positions[self.index, 1]
+
+    @y.setter
+    def y(self, value):
+        self.system.positions[self.index, 1] = value
+
+    @property
+    def x_vel(self):
+        return self.system.velocities[self.index, 0]
+
+    @x_vel.setter
+    def x_vel(self, value):
+        self.system.velocities[self.index, 0] = value
+
+    @property
+    def y_vel(self):
+        return self.system.velocities[self.index, 1]
+
+    @y_vel.setter
+    def y_vel(self, value):
+        self.system.velocities[self.index, 1] = value
+
+    @property
+    def mass(self):
+        return self.system.masses[self.index]
+
+    @mass.setter
+    def mass(self, value):
+        self.system.masses[self.index] = value
+
+    #Position to draw at, interpolated between physics steps when available
+    @property
+    def render_pos(self):
+        return tuple(draw_positions(self.system)[self.index])
+
+    @property
+    def distance_to_sun(self):
+        return self.system.distance_to_sun[self.index]
+
+    @property
+    def sun(self):
+        return self.system.sun_index == self.index
+
+    @sun.setter
+    def sun(self, value):
+        if value:
+            self.system.set_sun(self.index)
+
+    #Draw the whole orbit trail, only the parts inside the window
+    def draw_trail(self, surface):
+        self.trail_version = self.orbit.version
         if len(self.orbit) > 2:
-            updated_points = [(x * self.SCALE + WCENTRE, y * self.SCALE + HCENTRE) for x, y in self.orbit]
-            if show_orbit:
-                pygame.draw.lines(WIN, self.colour, False, updated_points, 1)
-        pygame.draw.circle(win, self.colour, (x, y), radius)
+            updated_points = self.orbit.lod_screen_points(camera.scale, camera.centre_x, camera.centre_y)
+            for run in camera.cull_polyline(updated_points):
+                pygame.draw.lines(surface, self.colour, False, run, 1)
+
+    #Draw the segment from the trail's previous point to its newest one, returns the rectangle drawn on
+    def draw_trail_head(self, surface):
+        segment = self.orbit.head_screen_segment(camera.scale, camera.centre_x, camera.centre_y)
+        if segment is None:
+            return None
+        return pygame.draw.line(surface, self.colour, *segment, 1)
+
+    #Render the planet on the window
+    #Draw the planet, returns the rectangles drawn on
+    #The main loop projects and culls every body at once and passes the screen position in, otherwise it is worked out here
+    def draw(self, win, pos=None):
+        radius = self.radiusScale * self.EarthRadius
+        rects = []
+        if pos is None:
+            pos = camera.world_to_screen(self.render_pos)
+            #Planets outside the window are not drawn
+            if not camera.visible(pos, radius + camera.MARGIN):
+                return rects
+        x, y = pos
+        rects.append(pygame.draw.circle(win, self.colour, (x, y), radius))
         
         #Render distance to sun
         if not self.sun and details:
-            distance_text = FONT.render(f"{round(self.distance_to_sun/1000, 1)} km", 1, colour_mapping['WHITE'])
-            WIN.blit(distance_text, (x - distance_text.get_width(), y - distance_text.get_height()))
-
-
-    #Calculate force of attraction using Newton's law of universal gravitation
-    def attraction(self, other):
-        #Calculate the difference between the two planets in x and y directions
-        dx = other.x - self.x
-        dy = other.y - self.y
-        # Calculate distance using pythagoras theorem
-        distance = math.sqrt(dx ** 2 + dy ** 2)
-
-        if other.sun:
-            self.distance_to_sun = distance
-        # Calculate force of attraction using Newton's law
-        force = self.G * self.mass * other.mass / distance**2
-        # Calculating angle between the two planets
-        theta = math.atan2(dy, dx)
-        # Calculate the x and y components of the force
-        force_x = math.cos(theta) * force
-        force_y = math.sin(theta) * force
-        return force_x, force_y
-    
-    #Update the position of the planet
-    def update_position(self, planets):
+            distance_text = text_cache.render(FONT, f"{round(self.distance_to_sun/1000, 1)} km", 1, colour_mapping['WHITE'])
+            rects.append(WIN.blit(distance_text, (x - distance_text.get_width(), y - distance_text.get_height())))
+        return rects
 
-        if Planet.pause:
-            return
-        # Calculates resultant force
-        total_fx = 0
-        total_fy = 0
-        for planet in planets:
-            if self == planet:
-                continue
-            if self.sun:
-                return 
 
-            fx, fy = self.attraction(planet)
-            total_fx += fx
-            total_fy += fy
-
-        # Converting force into components of velocity 
-        # Updating velocities
-        self.x_vel += total_fx / self.mass * self.TIMESTEP
-        self.y_vel += total_fy / self.mass * self.TIMESTEP
-
-        # Updating positions
-        self.x += self.x_vel * self.TIMESTEP
-        self.y += self.y_vel * self.TIMESTEP
-        self.orbit.append((self.x, self.y))
-
-    #Render information about the selected planet
+    #Render information about the selected planet, returns the rectangles drawn on
     def render_planet_info(self, win, sun):
         if show_lebron:
             text = 'LEBRON'
-            name_text = FONT.render(f"Name: {text}", 1, colour_mapping['YELLOW'])
-            mass_text = FONT.render(f"Mass: {text} kg", 1, colour_mapping['YELLOW'])
-            orbital_period_text = FONT.render(f"Orbital Period: {text} days", 1, colour_mapping['YELLOW'])
-            distance_text = FONT.render(f"Distance from Sun: {text} km", 1, colour_mapping['YELLOW'])
+            name_text = text_cache.render(FONT, f"Name: {text}", 1, colour_mapping['YELLOW'])
+            mass_text = text_cache.render(FONT, f"Mass: {text} kg", 1, colour_mapping['YELLOW'])
+            orbital_period_text = text_cache.render(FONT, f"Orbital Period: {text} days", 1, colour_mapping['YELLOW'])
+            distance_text = text_cache.render(FONT, f"Distance from Sun: {text} km", 1, colour_mapping['YELLOW'])
             velocity = math.sqrt(self.x_vel**2 + self.y_vel**2)
-            vel_text = FONT.render(f"Velocity: {text} km/s", 1, colour_mapping['YELLOW'])
+            vel_text = text_cache.render(FONT, f"Velocity: {text} km/s", 1, colour_mapping['YELLOW'])
 
         else:
-            name_text = FONT.render(f"Name: {self.name}", 1, self.colour)
-            mass_text = FONT.render(f"Mass: {self.mass:.5g} kg", 1, self.colour)
-            orbital_period_text = FONT.render(f"Orbital Period: {round(self.orbital_period, 2)} days", 1, self.colour)
-            distance_text = FONT.render(f"Distance from Sun: {round(self.distance_to_sun / 1000, 2):,} km", 1, self.colour)
+            name_text = text_cache.render(FONT, f"Name: {self.name}", 1, self.colour)
+            mass_text = text_cache.render(FONT, f"Mass: {self.mass:.5g} kg", 1, self.colour)
+            orbital_period_text = text_cache.render(FONT, f"Orbital Period: {round(self.orbital_period, 2)} days", 1, self.colour)
+            distance_text = text_cache.render(FONT, f"Distance from Sun: {round(self.distance_to_sun / 1000, 2):,} km", 1, self.colour)
             velocity = math.sqrt(self.x_vel**2 + self.y_vel**2)
-            vel_text = FONT.render(f"Velocity: {round(velocity / 1000, 2):,} km/s", 1, self.colour)
+            vel_text = text_cache.render(FONT, f"Velocity: {round(velocity / 1000, 2):,} km/s", 1, self.colour)
 
         #Calculate the alignment of the text
         alignment = max(
@@ -177,34 +256,91 @@ class Planet:
             distance_text.get_width(), vel_text.get_width()) + 15
         
         #Rendering text
-        WIN.blit(name_text, (WIDTH - alignment, 15))
-        WIN.blit(mass_text, (WIDTH - alignment, 35))
-        WIN.blit(orbital_period_text, (WIDTH - alignment, 55))
-        WIN.blit(distance_text, (WIDTH - alignment, 75))
-        WIN.blit(vel_text, (WIDTH - alignment, 95))
+        rects = [
+            WIN.blit(name_text, (WIDTH - alignment, 15)),
+            WIN.blit(mass_text, (WIDTH - alignment, 35)),
+            WIN.blit(orbital_period_text, (WIDTH - alignment, 55)),
+            WIN.blit(distance_text, (WIDTH - alignment, 75)),
+            WIN.blit(vel_text, (WIDTH - alignment, 95)),
+        ]
 
         # Calculating the position of the planet
-        x = self.x * self.SCALE + WCENTRE
-        y = self.y * self.SCALE + HCENTRE
+        x, y = camera.world_to_screen(self.render_pos)
         planet_pos = x, y 
-        sun_pos = WCENTRE, HCENTRE
 
         #Draws a line from the sun to the planet
-        pygame.draw.lines( WIN, self.colour, False, [sun_pos, planet_pos], 2)
+        if sun is not None:
+            sun_pos = tuple(camera.world_to_screen(sun.render_pos))
+            rects.append(pygame.draw.lines( WIN, self.colour, False, [sun_pos, planet_pos], 2))
         if not self.sun:
             #Renders the distance from sun as text
-            distance_text = FONT.render(f"{round(self.distance_to_sun/1000, 1)} km", 1, colour_mapping['WHITE'])
-            WIN.blit(distance_text, (x - distance_text.get_width(), y - distance_text.get_height()))
+            distance_text = text_cache.render(FONT, f"{round(self.distance_to_sun/1000, 1)} km", 1, colour_mapping['WHITE'])
+            rects.append(WIN.blit(distance_text, (x - distance_text.get_width(), y - distance_text.get_height())))
+        return rects
 
     #Lebron function
     def lebron(self,):
         if self.name == 'Lebron':
-            WIN.blit(self.imagepath, (WCENTRE - (80//2), HCENTRE - (75//2)))
+            return WIN.blit(self.imagepath, (camera.centre_x - (80//2), camera.centre_y - (75//2)))
+
+#Positions every body is drawn at, interpolated between physics steps when available
+def draw_positions(system):
+    if system.render_positions is None or len(system.render_positions) != len(system):
+        return system.positions
+    return system.render_positions
+
+#Render a swarm of test particles as a point cloud, one pixel each, returns the rectangle around the visible particles
+def draw_particles(win, swarm):
+    points = camera.world_to_screen(swarm.positions).astype(int)
+    x = points[:, 0]
+    y = points[:, 1]
+    width, height = win.get_size()
+    visible = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    if not visible.any():
+        return None
+    x = x[visible]
+    y = y[visible]
+    pixels = pygame.surfarray.pixels2d(win)
+    pixels[x, y] = win.map_rgb(swarm.colour)
+    # releases the lock on the window surface
+    del pixels
+    return pygame.Rect(x.min(), y.min(), x.max() - x.min() + 1, y.max() - y.min() + 1)
+
+#Background stars rendered once, shimmer comes from cycling through a few pre-drawn frames
+class Starfield:
+    FRAMES = 4
+    #Each frame is shown this many window frames, changing frame redraws the whole window so it is kept slow
+    TWINKLE_FRAMES = 15
+
+    def __init__(self, stars, size):
+        self.frames = []
+        self.frame = 0
+        self.ticks = 0
+        for _ in range(self.FRAMES):
+            # 8 bit surfaces keep the frames small even on large windows
+            frame = pygame.Surface(size, 0, 8)
+            frame.set_colorkey(colour_mapping['BLACK'])
+            for x, y in stars:
+                # random module is used to simulate shimmering stars
+                pygame.draw.line(frame, colour_mapping['WHITE'], (x, y), (x + random.randint(-1, 1), y + random.randint(-1, 1)), 1)
+            self.frames.append(frame)
+
+    def draw(self, win):
+        win.blit(self.frames[self.frame], (0, 0))
+
+    #Count a window frame, returns True when the next baked frame should be shown
+    def tick(self):
+        self.ticks += 1
+        if self.ticks < self.TWINKLE_FRAMES:
+            return False
+        self.ticks = 0
+        self.frame = (self.frame + 1) % self.FRAMES
+        return True
 
 #Main function
 def main():
     #Globalise variables
-    global WIN_CENTRE, WCENTRE, HCENTRE, WIDTH, HEIGHT, default, details, show_orbit, show_stars, show_lebron
+    global WIDTH, HEIGHT, days_per_second, details, show_orbit, show_stars, show_lebron, replaying
     run = True
     pause = False
     drag = False
@@ -222,116 +358,166 @@ def main():
         exists = False
     if not exists:
         database.create_db()
+    # Upgrade databases made by older versions
+    for name, mass in schema.migrate(conn):
+        print(schema.unreadable_message(name, mass))
 
     #Set up clock
     clock = pygame.time.Clock()
 
-    #Fetching all the planetary data form database using SQL queries
-    sun_x, sun_y, sun_radiusScale, sun_colour, sun_mass, sun_orbital_period, sun_name = c.execute("""
-                                                                                                  SELECT position.x, 
-                                                                                                         position.y, 
-                                                                                                         physical_properties.radiusscale, 
-                                                                                                         physical_properties.colour, 
-                                                                                                         physical_properties.mass, 
-                                                                                                         physical_properties.orbital_period, 
-                                                                                                         celestial_bodies.name 
-                                                                                                         FROM celestial_bodies JOIN position 
-                                                                                                         ON celestial_bodies.id = position.celestial_body_id 
-                                                                                                         JOIN physical_properties 
-                                                                                                         ON celestial_bodies.id = physical_properties.celestial_body_id 
-                                                                                                         WHERE celestial_bodies.name = 'Sun'
-                                                                                                  """).fetchone()
-    mercury_x, mercury_y, mercury_radiusScale, mercury_colour, mercury_mass, mercury_orbital_period, mercury_name = c.execute("SELECT position.x, position.y, physical_properties.radiusscale, physical_properties.colour, physical_properties.mass, physical_properties.orbital_period, celestial_bodies.name FROM celestial_bodies JOIN position ON celestial_bodies.id = position.celestial_body_id JOIN physical_properties ON celestial_bodies.id = physical_properties.celestial_body_id WHERE celestial_bodies.name = 'Mercury'").fetchone()
-    venus_x, venus_y, venus_radiusScale, venus_colour, venus_mass, venus_orbital_period, venus_name = c.execute("SELECT position.x, position.y, physical_properties.radiusscale, physical_properties.colour, physical_properties.mass, physical_properties.orbital_period, celestial_bodies.name FROM celestial_bodies JOIN position ON celestial_bodies.id = position.celestial_body_id JOIN physical_properties ON celestial_bodies.id = physical_properties.celestial_body_id WHERE celestial_bodies.name = 'Venus'").fetchone()
-    earth_x, earth_y, earth_radiusScale, earth_colour, earth_mass, earth_orbital_period, earth_name = c.execute("SELECT position.x, position.y, physical_properties.radiusscale, physical_properties.colour, physical_properties.mass, physical_properties.orbital_period, celestial_bodies.name FROM celestial_bodies JOIN position ON celestial_bodies.id = position.celestial_body_id JOIN physical_properties ON celestial_bodies.id = physical_properties.celestial_body_id WHERE celestial_bodies.name = 'Earth'").fetchone()
-    mars_x, mars_y, mars_radiusScale, mars_colour, mars_mass, mars_orbital_period, mars_name = c.execute("SELECT position.x, position.y, physical_properties.radiusscale, physical_properties.colour, physical_properties.mass, physical_properties.orbital_period, celestial_bodies.name FROM celestial_bodies JOIN position ON celestial_bodies.id = position.celestial_body_id JOIN physical_properties ON celestial_bodies.id = physical_properties.celestial_body_id WHERE celestial_bodies.name = 'Mars'").fetchone()
-    jupiter_x, jupiter_y, jupiter_radiusScale, jupiter_colour, jupiter_mass, jupiter_orbital_period, jupiter_name = c.execute("SELECT position.x, position.y, physical_properties.radiusscale, physical_properties.colour, physical_properties.mass, physical_properties.orbital_period, celestial_bodies.name FROM celestial_bodies JOIN position ON celestial_bodies.id = position.celestial_body_id JOIN physical_properties ON celestial_bodies.id = physical_properties.celestial_body_id WHERE celestial_bodies.name = 'Jupiter'").fetchone()
-    saturn_x, saturn_y, saturn_radiusScale, saturn_colour, saturn_mass, saturn_orbital_period, saturn_name = c.execute("SELECT position.x, position.y, physical_properties.radiusscale, physical_properties.colour, physical_properties.mass, physical_properties.orbital_period, celestial_bodies.name FROM celestial_bodies JOIN position ON celestial_bodies.id = position.celestial_body_id JOIN physical_properties ON celestial_bodies.id = physical_properties.celestial_body_id WHERE celestial_bodies.name = 'Saturn'").fetchone()
-    uranus_x, uranus_y, uranus_radiusScale, uranus_colour, uranus_mass, uranus_orbital_period, uranus_name = c.execute("SELECT position.x, position.y, physical_properties.radiusscale, physical_properties.colour, physical_properties.mass, physical_properties.orbital_period, celestial_bodies.name FROM celestial_bodies JOIN position ON celestial_bodies.id = position.celestial_body_id JOIN physical_properties ON celestial_bodies.id = physical_properties.celestial_body_id WHERE celestial_bodies.name = 'Uranus'").fetchone()
-    neptune_x, neptune_y, neptune_radiusScale, neptune_colour, neptune_mass, neptune_orbital_period, neptune_name = c.execute("SELECT position.x, position.y, physical_properties.radiusscale, physical_properties.colour, physical_properties.mass, physical_properties.orbital_period, celestial_bodies.name FROM celestial_bodies JOIN position ON celestial_bodies.id = position.celestial_body_id JOIN physical_properties ON celestial_bodies.id = physical_properties.celestial_body_id WHERE celestial_bodies.name = 'Neptune'").fetchone()
-    
-    # Setting up planets objects
-    sun = Planet(sun_x, sun_y, sun_radiusScale, colour_mapping[sun_colour], int(eval(sun_mass)), sun_orbital_period, sun_name)
-    sun.sun = True
-
-    mercury = Planet(mercury_x * Planet.AU, mercury_y, mercury_radiusScale, colour_mapping[mercury_colour], int(eval(mercury_mass)), mercury_orbital_period, mercury_name)
-    mercury.y_vel = -47.4 * 1000
-
-    venus = Planet(venus_x * Planet.AU, venus_y, venus_radiusScale, colour_mapping[venus_colour], int(eval(venus_mass)), venus_orbital_period, venus_name)
-    venus.y_vel = -35.02 * 1000
-
-    earth = Planet(earth_x * Planet.AU, earth_y, earth_radiusScale, colour_mapping[earth_colour], int(eval(earth_mass)), earth_orbital_period, earth_name)
-    earth.y_vel = 29.783 * 1000 
-
-    mars = Planet(mars_x * Planet.AU, mars_y, mars_radiusScale, colour_mapping[mars_colour], int(eval(mars_mass)), mars_orbital_period, mars_name)
-    mars.y_vel = 24.077 * 1000
-
-    jupiter = Planet(jupiter_x * Planet.AU, jupiter_y, jupiter_radiusScale, colour_mapping[jupiter_colour], int(eval(jupiter_mass)), jupiter_orbital_period, jupiter_name)
-    jupiter.y_vel = -13.06 * 1000
-
-    saturn = Planet(saturn_x * Planet.AU, saturn_y, saturn_radiusScale, colour_mapping[saturn_colour], int(eval(saturn_mass)), saturn_orbital_period, saturn_name)
-    saturn.y_vel = -9.68 * 1000
-
-    uranus = Planet(uranus_x * Planet.AU, uranus_y, uranus_radiusScale, colour_mapping[uranus_colour], int(eval(uranus_mass)), uranus_orbital_period, uranus_name)
-    uranus.y_vel = -6.80 * 1000
-
-    neptune = Planet(neptune_x * Planet.AU, neptune_y, neptune_radiusScale, colour_mapping[neptune_colour], int(eval(neptune_mass)), neptune_orbital_period, neptune_name)
-    neptune.y_vel = -5.43 * 1000
+    # Setting up planets objects, their state is stored in one system
+    system = physics.BodySystem(Planet.G)
+    if solver_name == 'barneshut':
+        system.solver = barneshut.BarnesHut(theta, solver_threshold)
+    if integrator_name == 'adaptive':
+        integrator = integrators.create(integrator_name, tolerance=tolerance)
+    else:
+        integrator = integrators.create(integrator_name)
+
+    #Fetching all the planetary data from the database in one query, the system's arrays are filled in one go and each planet views its row
+    loaded = catalogue.load_body_rows(c)
+    bodies = list(loaded.values())
+    rows = catalogue.add_bodies(system, bodies)
+    planets = [Planet(system, x, y, radiusScale, colour_mapping.get(colour, colour_mapping['WHITE']), mass, orbital_period, name, index=index)
+               for index, (name, x, y, x_vel, y_vel, radiusScale, colour, mass, orbital_period) in zip(rows, bodies)]
+    # a catalogue without a Sun simply has nothing held in place
+    sun = next((planet for planet in planets if planet.sun), None)
+
+    # Setting up asteroids and comets around the sun, they orbit clockwise like the planets
+    if sun is not None and asteroid_count:
+        system.particles.append(particles.ParticleSwarm.seed(system, sun.index, asteroid_count, (2.1 * Planet.AU, 3.3 * Planet.AU), (0, 0.2), sense=-1, colour=colour_mapping['LIGHT_SPACE'], name='Asteroids'))
+    if sun is not None and comet_count:
+        system.particles.append(particles.ParticleSwarm.seed(system, sun.index, comet_count, (5 * Planet.AU, 40 * Planet.AU), (0.6, 0.95), sense=-1, colour=colour_mapping['AQUA'], name='Comets'))
+
+    # Carries on from the last checkpoint, bodies added or edited in the database since then start from their initial conditions
+    saved = checkpoint.load(checkpoint_path) if checkpoint_path else None
+    if saved is not None:
+        checkpoint.restore(saved, system, [planet.name for planet in planets], [planet.orbit for planet in planets],
+                           [checkpoint.fingerprint(body) for body in bodies])
+        Planet.TIMESTEP = float(saved['timestep'])
 
     # Setting up lebron
     lebron_img = pygame.image.load('lebron.jpg')
     lebron_img = pygame.transform.scale(lebron_img, (120, 75))
     lebron_img = lebron_img.subsurface((20, 0, 80, 75))
-    lebron_x, lebron_y, lebron_radiusScale, lebron_colour, lebron_mass, lebron_orbital_period, lebron_name = c.execute("SELECT position.x, position.y, physical_properties.radiusscale, physical_properties.colour, physical_properties.mass, physical_properties.orbital_period, celestial_bodies.name FROM celestial_bodies JOIN position ON celestial_bodies.id = position.celestial_body_id JOIN physical_properties ON celestial_bodies.id = physical_properties.celestial_body_id WHERE celestial_bodies.name = 'Lebron'").fetchone()
-    lebron = Planet(lebron_x, lebron_y, lebron_radiusScale, colour_mapping[lebron_colour], int(eval(lebron_mass)), lebron_orbital_period, lebron_name, lebron_img)
+    # lebron is never simulated so it is kept out of the planets' system, databases without him just miss the easter egg
+    lebron = None
+    for lebron_name, lebron_x, lebron_y, _, _, lebron_radiusScale, lebron_colour, lebron_mass, lebron_orbital_period in catalogue.load_bodies(c, ['Lebron']):
+        lebron = Planet(physics.BodySystem(Planet.G), lebron_x, lebron_y, lebron_radiusScale, colour_mapping.get(lebron_colour, colour_mapping['WHITE']), lebron_mass, lebron_orbital_period, lebron_name, lebron_img)
 
-    # Setting up list of planets
-    planets = [sun, earth, mars, mercury, venus, jupiter, saturn, uranus, neptune ]
     #Selected planet is default to earth
-    selected_planet = earth
-
-    #Converts a position on the window to real universe coordinates
-    def convert_to_real(pos):
-        real_pos = Vector2(pos) - WIN_CENTRE
-        real_pos.x /= Planet.SCALE
-        real_pos.y /= -Planet.SCALE
-        return real_pos
-    
-    #Render simulator information on the window
+    selected_planet = next((planet for planet in planets if planet.name == 'Earth'), None)
+
+    #Zooms in (direction 1) or out (direction -1) by one notch, however many bodies are loaded
+    def zoom(direction):
+        if direction < 0 and camera.scale <= camera.MIN_SCALE:
+            return
+        camera.zoom(direction * ZOOM_STEP)
+        Planet.EarthRadius += RADIUS_STEP * direction
+
+    #Render simulator information on the window, returns the rectangles drawn on
     def render_win_info():
-        x, y = convert_to_real(pygame.mouse.get_pos())
-        x_text = FONT.render(f"Position - x: {round(x // 1000):,}km", 1, colour_mapping['WHITE'])
-        y_text = FONT.render(f"Position - y: {round(y // 1000):,}km", 1, colour_mapping['WHITE'])
-        scale_text = FONT.render(f"Scale: km per pixel: {round(1 / Planet.SCALE) // 1000:,}km", 1, colour_mapping['WHITE'])
-        dps = ((1/default) * clock.get_fps())
-        fps_text = FONT.render(f"FPS: {round(float(clock.get_fps()), 4)}", 1, colour_mapping['WHITE'])
-        time_scale_text = FONT.render(f"Time scale: {round(dps, 10)} days a second", 1, colour_mapping['WHITE'])
-        author_text = FONT.render(f"Author: Ying Jin Liang", 1, colour_mapping['WHITE'])
-        author_rect = author_text.get_rect(bottomright = (WIDTH - 5, HEIGHT - 5))
-
-        WIN.blit(time_scale_text, (15, 15))
-        WIN.blit(x_text, (15, 35))
-        WIN.blit(y_text, (15, 55))
-        WIN.blit(scale_text, (15, 75))
-        WIN.blit(fps_text, (15, 95))
-        WIN.blit(author_text, author_rect)
-
-    #Render tips on the window
-    def render_tips():
-        tip1 = FONT.render("Show/Hide stars: S", 1, colour_mapping['WHITE'])
-        tip2 = FONT.render("Select/Deselect planet: LMB/RMB", 1, colour_mapping['WHITE'])
-        tip3 = FONT.render("Pause/Unpause: SPACE", 1, colour_mapping['WHITE'])
-        tip4 = FONT.render("Show orbit: O", 1, colour_mapping['WHITE'])
-        tip5 = FONT.render("Show/Hide distances: D", 1, colour_mapping['WHITE'])
-        tip6 = FONT.render("Zoom +/- : UP/DOWN or Mouse Wheel", 1, colour_mapping['WHITE'])
-        tip7 = FONT.render("Use mouse to adjust position", 1, colour_mapping['WHITE'])
-        tip8 = FONT.render("Use slider to adjust time scale", 1, colour_mapping['WHITE'])
-        tips = [tip1, tip2, tip3, tip4, tip5, tip6, tip7, tip8]
+        # y is shown increasing upwards
+        x, y = camera.screen_to_world(pygame.mouse.get_pos())
+        y = -y
+        x_text = text_cache.render(FONT, f"Position - x: {round(x // 1000):,}km", 1, colour_mapping['WHITE'])
+        y_text = text_cache.render(FONT, f"Position - y: {round(y // 1000):,}km", 1, colour_mapping['WHITE'])
+        scale_text = text_cache.render(FONT, f"Scale: km per pixel: {round(1 / camera.scale) // 1000:,}km", 1, colour_mapping['WHITE'])
+        fps_text = text_cache.render(FONT, f"FPS: {round(float(clock.get_fps()), 4)}", 1, colour_mapping['WHITE'])
+        time_scale_text = text_cache.render(FONT, f"Time scale: {round(days_per_second, 1)} days a second", 1, colour_mapping['WHITE'])
+
+        rects = [
+            WIN.blit(time_scale_text, (15, 15)),
+            WIN.blit(x_text, (15, 35)),
+            WIN.blit(y_text, (15, 55)),
+            WIN.blit(scale_text, (15, 75)),
+            WIN.blit(fps_text, (15, 95)),
+        ]
+        # Adaptive integrators report how hard they are working
+        if hasattr(integrator, 'steps_per_day'):
+            steps_text = text_cache.render(FONT, f"Steps per day: {round(integrator.steps_per_day, 2)}", 1, colour_mapping['WHITE'])
+            rects.append(WIN.blit(steps_text, (15, 115)))
+        return rects
+
+    #Render the replay timeline at the bottom of the window, returns the rectangles drawn on
+    def render_timeline():
+        timeline_rect.midbottom = (WIDTH // 2, HEIGHT - 15)
+        start, end = recording.start_time, recording.end_time
+        fraction = (replay_time - start) / (end - start) if end > start else 1
+        rects = [
+            pygame.draw.rect(WIN, colour_mapping['DARK_GREY'], timeline_rect),
+            pygame.draw.rect(WIN, colour_mapping['RED'], (timeline_rect.x, timeline_rect.y, fraction * timeline_rect.width, timeline_rect.height)),
+        ]
+        state = ('backwards' if replay_direction < 0 else 'forwards') if replay_playing else 'paused'
+        text = text_cache.render(FONT, f"Replay: day {replay_time / scheduling.DAY:,.0f} of {end / scheduling.DAY:,.0f} ({state})", 1, colour_mapping['WHITE'])
+        rects.append(WIN.blit(text, text.get_rect(midbottom=(timeline_rect.centerx, timeline_rect.y - 5))))
+        return rects
+
+    #Simulated time under a point on the replay timeline
+    def timeline_time(x):
+        fraction = min(max((x - timeline_rect.x) / timeline_rect.width, 0), 1)
+        return recording.start_time + fraction * (recording.end_time - recording.start_time)
+
+    #Render tips and the author, they only change when the window is resized
+    def render_tips(surface):
+        surface.blit(tips_surface, (15, HEIGHT - tips_surface.get_height()))
+        author_text = text_cache.render(FONT, f"Author: Ying Jin Liang", 1, colour_mapping['WHITE'])
+        surface.blit(author_text, author_text.get_rect(bottomright = (WIDTH - 5, HEIGHT - 5)))
+
+    #Draw everything that stays put between frames: background, stars, slider, exit button and tips
+    def draw_static(surface):
+        surface.fill(colour_mapping['BLACK'])
+        # only draws stars if they are enabled
+        if show_stars:
+            starfield.draw(surface)
+
+        #Draw slider
+        pygame.draw.rect(surface, colour_mapping['DARK_GREY'], (slider_x, slider_y, slider_width, slider_height))
+        slider_percent = math.log(days_per_second / slider_min) / math.log(slider_max / slider_min)
+        #Draw slider fill area
+        pygame.draw.rect(surface, colour_mapping['RED'], (slider_x, slider_y, slider_percent * slider_width, slider_height))
+
+        # Draw the exit button
+        pygame.draw.rect(surface, colour_mapping['DARK_SPACE'], exit_button_rect)
+        text = text_cache.render(FONT, "Exit", True, colour_mapping['WHITE'])
+        surface.blit(text, text.get_rect(center=exit_button_rect.center))
+
+        render_tips(surface)
+
+    #Draw every orbit trail onto the trail layer
+    def draw_trails(surface):
+        for planet in planets:
+            if show_orbit and not replaying:
+                planet.draw_trail(surface)
+            else:
+                planet.trail_version = planet.orbit.version
+
+    #Compose the constant tips into one surface so they are a single blit each frame
+    def compose_tips():
+        tips = [
+            "Show/Hide stars: S",
+            "Select/Deselect planet: LMB/RMB",
+            "Pause/Unpause: SPACE",
+            "Show orbit: O",
+            "Show/Hide distances: D",
+            "Zoom +/- : UP/DOWN or Mouse Wheel",
+            "Use mouse to adjust position",
+            "Use slider to adjust time scale",
+        ]
+        if record_path:
+            tips.append("Replay: R, play/reverse: SPACE/LEFT/RIGHT")
+        tips = [FONT.render(tip, 1, colour_mapping['WHITE']) for tip in tips]
+        width = max(tip.get_width() for tip in tips)
+        height = tips[0].get_height() + len(tips) * 15
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
 
         # Calculates alignment and renders each tip
         for i, tip in enumerate(tips):
             displacement = (i+1) * 15
-            WIN.blit(tip, (15, HEIGHT - tip.get_height() - displacement))
+            surface.blit(tip, (0, height - tip.get_height() - displacement))
+        return surface
+
+    tips_surface = compose_tips()
 
     #Generate random stars
     def generate_stars():
@@ -349,10 +535,12 @@ def main():
     slider_height = 20
     slider_x = 15
     slider_y = 140
+    # slider is logarithmic between these numbers of days per second
     slider_min = 1
-    slider_max = 60
+    slider_max = 1000
     slider_Dragging = False
     drag_offset = 0
+    exit_button_rect = pygame.Rect(15, 175, 50, 20)
 
     #Uses threads to draw orbits (faster for exe file)
     orbit_threads = [threading.Thread(target=planet.draw, args=(WIN,)) for planet in planets]
@@ -360,40 +548,180 @@ def main():
         thread.start()
 
     # Generate random stars
-    stars = generate_stars()
+    starfield = Starfield(generate_stars(), (WIDTH, HEIGHT))
+
+    # Only the parts of the window that change each frame are redrawn and sent to the display
+    renderer = Renderer.Renderer(WIN)
+
+    # Physics runs in fixed steps, as many per frame as the time scale needs
+    scheduler = scheduling.FixedStepScheduler(system, integrator, Planet.TIMESTEP, days_per_second)
+
+    # Optionally run the physics on its own thread, the main loop then only reads its snapshots
+    worker = None
+    snapshots_read = 0
+    if threaded_physics:
+        worker = workers.PhysicsWorker(system, integrator, Planet.TIMESTEP, days_per_second, Planet.pause)
+        worker.start()
+
+    #Save the simulation so it can be resumed, the worker is asked for a copy of its system as it owns the latest state
+    def save_checkpoint():
+        if not checkpoint_path:
+            return
+        current = system
+        if worker:
+            # a physics thread that has died would never answer, so quitting must not wait on it forever
+            if not worker.is_alive():
+                print("Could not save checkpoint: the physics thread has stopped")
+                return
+            copies = queue.Queue()
+            worker.send('copy', copies)
+            try:
+                current = copies.get(timeout=CHECKPOINT_TIMEOUT)
+            except queue.Empty:
+                print(f"Could not save checkpoint: the physics thread did not respond within {CHECKPOINT_TIMEOUT} s")
+                return
+        names = [None] * len(current)
+        trails = [None] * len(current)
+        fingerprints = [None] * len(current)
+        # the watcher holds the database row each planet was last loaded from
+        rows = {body[0]: body for body in watcher.bodies.values()}
+        for planet in planets:
+            names[planet.index] = planet.name
+            trails[planet.index] = planet.orbit
+            if planet.name in rows:
+                fingerprints[planet.index] = checkpoint.fingerprint(rows[planet.name])
+        try:
+            checkpoint.save(checkpoint_path, current, names, trails, Planet.TIMESTEP, fingerprints)
+        except OSError as e:
+            print(f"Could not save checkpoint to {checkpoint_path}: {e}")
+
+    next_autosave = system.time + autosave_interval
+
+    # Optionally records body positions to memory-mapped files so the run can be replayed
+    recording = recordings.Trajectory(record_path, [planet.name for planet in planets]) if record_path else None
+    next_record = system.time
+    replaying = False
+    replay_time = 0.0
+    replay_direction = 1
+    replay_playing = False
+    timeline_dragging = False
+    timeline_rect = pygame.Rect(0, 0, 400, 10)
+
+    #Switch between the live simulation and replaying the recording, the physics is paused while replaying
+    def set_replaying(value):
+        global replaying
+        nonlocal replay_time, replay_playing
+        replaying = value
+        if worker:
+            worker.send('pause', Planet.pause or replaying)
+        if replaying:
+            recording.flush()
+            replay_time = recording.end_time
+            replay_playing = False
+        else:
+            # draws the live positions again
+            system.render_positions = None
+
+    if start_in_replay and recording is not None and len(recording):
+        set_replaying(True)
+        replay_time = recording.start_time
+        replay_playing = True
+
+    # Edits made in the database editor are applied to the running simulation
+    watcher = watching.ChangeWatcher("Planets.db", loaded)
+
+    #Apply bodies changed in the database, only values that changed are touched so edited bodies keep their orbits otherwise
+    def apply_changes(changes):
+        nonlocal selected_planet
+        by_name = {planet.name: planet for planet in planets}
+        for old, new in changes:
+            if (new or old)[0] in catalogue.HIDDEN_BODIES:
+                continue
+            planet = by_name.get(old[0]) if old else None
+
+            # deleted bodies stop attracting anything and are no longer drawn
+            if new is None:
+                if planet:
+                    planet.mass = 0
+                    if worker:
+                        worker.send('set', 'masses', planet.index, 0)
+                    planets.remove(planet)
+                    if selected_planet is planet:
+                        selected_planet = None
+                continue
+
+            name, x, y, x_vel, y_vel, radiusScale, colour, mass, orbital_period = new
+            if planet is None:
+                planet = Planet(system, x, y, radiusScale, colour_mapping.get(colour, colour_mapping['WHITE']), mass, orbital_period, name)
+                planet.x_vel = x_vel
+                planet.y_vel = y_vel
+                planets.append(planet)
+                # the worker adds the same row, its snapshots are ignored until they include it
+                if worker:
+                    worker.send('add', x, y, mass, x_vel, y_vel)
+                continue
+
+            planet.name = name
+            planet.radiusScale = radiusScale
+            planet.colour = colour_mapping.get(colour, colour_mapping['WHITE'])
+            planet.orbital_period = orbital_period
+            if mass != old[7]:
+                planet.mass = mass
+                if worker:
+                    worker.send('set', 'masses', planet.index, mass)
+            # a new starting position or velocity restarts the body from it
+            if (x, y, x_vel, y_vel) != old[1:5]:
+                planet.x, planet.y = x, y
+                if not planet.sun:
+                    planet.x_vel, planet.y_vel = x_vel, y_vel
+                planet.orbit.clear()
+                if worker:
+                    worker.send('set', 'positions', planet.index, (x, y))
+                    worker.send('set', 'velocities', planet.index, (planet.x_vel, planet.y_vel))
 
     #Main loop
     while run:
         # Initial setup
-        clock.tick(60)
-        WIN.fill(colour_mapping['BLACK'])
+        frame_time = clock.tick(60) / 1000
         WIDTH, HEIGHT = pygame.display.get_surface().get_size()
+        camera.resize(WIDTH, HEIGHT)
         
-        #Draw slider
-        pygame.draw.rect(WIN, colour_mapping['DARK_GREY'], (slider_x, slider_y, slider_width, slider_height))
-        slider_percent = (default - slider_min) / (slider_max - slider_min)
+        slider_percent = math.log(days_per_second / slider_min) / math.log(slider_max / slider_min)
         slider_fill_width = slider_percent * slider_width
-        #Draw slider fill area
-        pygame.draw.rect(WIN, colour_mapping['RED'], (slider_x, slider_y, slider_fill_width, slider_height))
 
-        # Draw the exit button
-        exit_button_rect = pygame.Rect(15, 175, 50, 20)
-        exit_colour = colour_mapping['DARK_SPACE']
-        pygame.draw.rect(WIN, exit_colour, exit_button_rect)
-        text = FONT.render("Exit", True, colour_mapping['WHITE'])
-        text_rect = text.get_rect(center=exit_button_rect.center)
-        WIN.blit(text, text_rect)
+        # Nothing moves while paused and untouched, so sleep until there is input instead of redrawing at 60 FPS
+        keys_pressed = pygame.key.get_pressed()
+        animating = replay_playing if replaying else not Planet.pause
+        idle = (not animating and not drag and not slider_Dragging and not timeline_dragging and not keys_pressed[K_UP] and not keys_pressed[K_DOWN]
+                and not (worker and worker.ring.published != snapshots_read))
+        events = Idle.poll(idle)
+        changes = watcher.poll(time.perf_counter())
+        apply_changes(changes)
+        if changes:
+            # bodies may have gone, changed colour or restarted their trails
+            renderer.invalidate(trails=True)
+        if idle:
+            # the time spent waiting is not frame time
+            clock.tick()
+            if not events and not changes:
+                continue
 
         #Event handling
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
                 run = False
 
             elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
+                if event.key == pygame.K_SPACE and replaying:
+                    # plays or pauses the replay
+                    replay_playing = not replay_playing
+
+                elif event.key == pygame.K_SPACE:
                     # Toggle pause/unpause if space is pressed
                     pause = not pause
                     Planet.pause = not Planet.pause
+                    if worker:
+                        worker.send('pause', Planet.pause)
                     
                 elif event.key == pygame.K_d:
                     # toggles details
@@ -406,6 +734,7 @@ def main():
                 elif event.key == pygame.K_s:
                     # toggles stars
                     show_stars = not show_stars
+                    renderer.invalidate(static=True)
 
                 elif event.key == pygame.K_l:
                     # toggles easter egg
@@ -413,20 +742,42 @@ def main():
                     selected_planet = sun
                     pygame.mixer.music.play()
 
+                elif event.key == pygame.K_r and recording is not None and len(recording):
+                    # switches between replaying the recording and the live simulation
+                    set_replaying(not replaying)
+
+                elif event.key in (pygame.K_LEFT, pygame.K_RIGHT) and replaying:
+                    # plays the replay backwards or forwards
+                    replay_direction = -1 if event.key == pygame.K_LEFT else 1
+                    replay_playing = True
+
+                elif event.key in (pygame.K_HOME, pygame.K_END) and replaying:
+                    # jumps to the start or end of the recording
+                    replay_time = recording.start_time if event.key == pygame.K_HOME else recording.end_time
+
             elif event.type == MOUSEBUTTONDOWN:
                 #detects player scrolling up
                 if event.button == 4:
-                    for planet in planets:
-                        Planet.SCALE += 1/Planet.AU  #Zoom in
-                        Planet.EarthRadius += 0.05
-                    planet.draw(WIN)
+                    zoom(1)  #Zoom in
 
                 elif event.button == 1:
                     #detects if player presses LMB
                     # returns to menu if player exits
                     if exit_button_rect.collidepoint(event.pos):
+                        save_checkpoint()
+                        if worker:
+                            worker.stop()
+                        watcher.close()
+                        if recording is not None:
+                            recording.close()
                         return 'menu'
 
+                    # detects player clicking on the replay timeline
+                    if replaying and timeline_rect.collidepoint(event.pos):
+                        timeline_dragging = True
+                        replay_time = timeline_time(event.pos[0])
+                        continue
+
                     # detects player clicking on slider
                     mouse_pos = pygame.mouse.get_pos()
                     if slider_x < mouse_pos[0] < slider_x + slider_width and slider_y < mouse_pos[1] < slider_y + slider_height:
@@ -439,18 +790,14 @@ def main():
                     drag_start = pygame.mouse.get_pos()
                     # detects if player clicks on a planet
                     for planet in planets:
-                        x = planet.x * Planet.SCALE + WCENTRE
-                        y = planet.y * Planet.SCALE + HCENTRE
-                        planet_pos = Vector2(x, y)
+                        planet_pos = Vector2(*camera.world_to_screen(planet.render_pos))
                         if planet_pos.distance_to(pygame.mouse.get_pos()) < planet.radiusScale * Planet.EarthRadius * 2:
                             selected_planet = planet 
                             break
                 # detects if player deslects planet
                 elif event.button == 3:
                     for planet in planets:
-                        x = planet.x * Planet.SCALE + WCENTRE
-                        y = planet.y * Planet.SCALE + HCENTRE
-                        planet_pos = Vector2(x, y)
+                        planet_pos = Vector2(*camera.world_to_screen(planet.render_pos))
                         if planet_pos.distance_to(pygame.mouse.get_pos()) < planet.radiusScale * Planet.EarthRadius * 2:
                             pass
                         else:
@@ -459,16 +806,12 @@ def main():
             # detects player scrolling down
             elif event.type == MOUSEBUTTONUP:
                 if event.button == 5:
-                    for planet in planets:
-                        if Planet.SCALE <= 1.8401069518717394e-10:
-                            continue
-                        Planet.SCALE -= 1/Planet.AU #Zoom out
-                        Planet.EarthRadius -= 0.05
-                        planet.draw(WIN)
+                    zoom(-1)  #Zoom out
 
                 # if player releases LMB, set dragging flag to false and reset initial mouse position
                 elif event.button == 1:
                     slider_Dragging = False
+                    timeline_dragging = False
                     drag = False
                     drag_start = None
             
@@ -478,9 +821,8 @@ def main():
                 #Whilst player is dragging their mouse and holding LMB...
                 if drag:
                     # Calculate position of mouse relative to initial mouse position and adjust the centre of the window
-                    WIN_CENTRE += Vector2(pygame.mouse.get_pos()) - drag_start
+                    camera.pan(*(Vector2(pygame.mouse.get_pos()) - drag_start))
                     drag_start = pygame.mouse.get_pos()
-                    WCENTRE, HCENTRE = WIN_CENTRE.x, WIN_CENTRE.y
 
                 # if the player is dragging the slider...
                 elif slider_Dragging:
@@ -492,54 +834,102 @@ def main():
                     elif slider_fill_width > slider_width:
                         slider_fill_width = slider_width
                     # calculate new timestep
-                    default = (slider_min + (slider_fill_width / slider_width) * (slider_max - slider_min))
-                    Planet.TIMESTEP = 3600 * 24 / default
+                    days_per_second = slider_min * (slider_max / slider_min) ** (slider_fill_width / slider_width)
+                    scheduler.days_per_second = days_per_second
+                    if worker:
+                        worker.send('days_per_second', days_per_second)
+                    renderer.invalidate(static=True)
+
+                # if the player is scrubbing through the replay...
+                elif timeline_dragging:
+                    replay_time = timeline_time(event.pos[0])
 
             # Detects window resizing, regenerates stars updates variables
             elif event.type == VIDEORESIZE:
                 WIDTH, HEIGHT = pygame.display.get_surface().get_size()
-                stars = generate_stars()
+                starfield = Starfield(generate_stars(), (WIDTH, HEIGHT))
+                renderer.invalidate(static=True)
 
         # Calculates  new position of the planets and draws them
+        if replaying:
+            # the recording is played back at the time scale without stepping the physics
+            stepped = False
+            if replay_playing and not timeline_dragging:
+                replay_time += replay_direction * frame_time * days_per_second * scheduling.DAY
+                if not recording.start_time <= replay_time <= recording.end_time:
+                    replay_time = min(max(replay_time, recording.start_time), recording.end_time)
+                    replay_playing = False
+            # bodies added after the recording started stay where they are
+            frame = system.positions.copy()
+            frame[:recording.bodies] = recording.positions_at(replay_time)
+            system.render_positions = frame
+        elif worker:
+            latest = worker.ring.read_latest(system, snapshots_read)
+            stepped = latest != snapshots_read
+            snapshots_read = latest
+        else:
+            stepped = not Planet.pause and scheduler.advance(frame_time)
+        if stepped:
+            for planet in planets:
+                if not planet.sun:
+                    planet.orbit.append(planet.x, planet.y, system.time)
+            if autosave_interval and system.time >= next_autosave:
+                save_checkpoint()
+                next_autosave = system.time + autosave_interval
+            if recording is not None and system.time >= next_record:
+                recording.append(system.time, system.positions)
+                next_record = system.time + record_interval
+
+        # stars twinkle by swapping the static layer's baked frame
+        if show_stars and starfield.tick():
+            renderer.invalidate(static=True)
+        # the trail layer is only drawn in full when the view changes, otherwise new segments are added to it
+        if any(planet.trail_version is None or planet.orbit.version - planet.trail_version > 1 for planet in planets):
+            renderer.invalidate(trails=True)
+        trails_shown = show_orbit and not replaying
+        renderer.begin(draw_static, draw_trails, (camera.scale, camera.centre_x, camera.centre_y, trails_shown))
         for planet in planets:
-            planet.update_position(planets)
-            planet.draw(WIN)
-
-        # only draws stars if they are enabled
-        if show_stars:
-            for star in stars:
-                # random module is used to simulate shimmering stars
-                pygame.draw.line(WIN, colour_mapping['WHITE'], (star[0], star[1]), (star[0] + random.randint(-1, 1), star[1] + random.randint(-1, 1)), 1) 
+            if planet.orbit.version != planet.trail_version:
+                if trails_shown:
+                    renderer.extend_trails(planet.draw_trail_head)
+                planet.trail_version = planet.orbit.version
+
+        # every body is projected and culled in one go, only the visible ones are drawn
+        indices = np.fromiter((planet.index for planet in planets), dtype=np.intp, count=len(planets))
+        radii = np.fromiter((planet.radiusScale for planet in planets), dtype=np.float64, count=len(planets)) * Planet.EarthRadius
+        screen = camera.world_to_screen(draw_positions(system)[indices])
+        for i in np.flatnonzero(camera.visible(screen, radii + camera.MARGIN)):
+            renderer.mark(planets[i].draw(WIN, screen[i]))
+        for swarm in system.particles:
+            renderer.mark(draw_particles(WIN, swarm))
         
         # easter egg
-        if show_lebron:
-            lebron.lebron()
+        if show_lebron and lebron is not None:
+            renderer.mark(lebron.lebron())
         else:
             pygame.mixer.music.pause()
 
         keys_pressed = pygame.key.get_pressed()
         if keys_pressed[K_UP]:
-            for planet in planets:
-                
-                Planet.SCALE += 1/Planet.AU  # Zoom in
-
-                Planet.EarthRadius += 0.05
-                planet.draw(WIN)
+            zoom(1)  # Zoom in
         elif keys_pressed[K_DOWN]:
-            for planet in planets:
-                if Planet.SCALE <= 1.8401069518717394e-10:
-                     continue
-                Planet.SCALE -= 1/Planet.AU  # Zoom out
-                Planet.EarthRadius -= 0.05
-                planet.draw(WIN)
-
-        # Renders simulator information and tips
-        render_win_info()
-        render_tips()
-        # Renders planet information for selected planet
-        selected_planet.render_planet_info(WIN, sun) if selected_planet else None
+            zoom(-1)  # Zoom out
 
-        pygame.display.update()
+        # Renders simulator information, the tips are part of the static layer
+        renderer.mark(render_win_info())
+        if replaying:
+            renderer.mark(render_timeline())
+        # Renders planet information for selected planet
+        if selected_planet:
+            renderer.mark(selected_planet.render_planet_info(WIN, sun))
+
+        renderer.end()
+    save_checkpoint()
+    if worker:
+        worker.stop()
+    watcher.close()
+    if recording is not None:
+        recording.close()
     pygame.quit()
     conn.commit
     conn.close()
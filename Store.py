@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+#One page of rows shown in the database editor: id, name, x coordinate, radius scale and mass
+#Bodies whose name contains the search text, in the order they were added
+PAGE_QUERY = """
+    SELECT celestial_bodies.id, celestial_bodies.name, position.x, physical_properties.radiusscale, physical_properties.mass
+    FROM celestial_bodies
+    JOIN position ON celestial_bodies.id = position.celestial_body_id
+    JOIN physical_properties ON celestial_bodies.id = physical_properties.celestial_body_id
+    WHERE celestial_bodies.name LIKE ? ESCAPE '\\'
+    ORDER BY celestial_bodies.id
+    LIMIT ? OFFSET ?
+"""
+
+COUNT_QUERY = """
+    SELECT COUNT(*)
+    FROM celestial_bodies
+    JOIN position ON celestial_bodies.id = position.celestial_body_id
+    JOIN physical_properties ON celestial_bodies.id = physical_properties.celestial_body_id
+    WHERE celestial_bodies.name LIKE ? ESCAPE '\\'
+"""
+
+
+#Turn search text into a LIKE pattern matching names that contain it
+def like_pattern(search):
+    search = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{search}%"
+
+
+#Data access for the database editor, one connection for the life of the editor and cached results
+#sqlite3 keeps the prepared statements for the queries run through the connection, so they are only parsed once
+class BodyStore:
+    def __init__(self, conn, max_pages=32):
+        self.conn = conn
+        self.max_pages = max_pages
+        #Recently used pages and row counts, least recently used pages are dropped first
+        self.pages = OrderedDict()
+        self.counts = {}
+
+    #Rows offset to offset + limit of the bodies matching the search, kept until the data changes
+    def page(self, search='', offset=0, limit=10):
+        key = (search, offset, limit)
+        rows = self.pages.get(key)
+        if rows is None:
+            rows = self.conn.execute(PAGE_QUERY, (like_pattern(search), limit, offset)).fetchall()
+            self.pages[key] = rows
+            if len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(key)
+        return rows
+
+    #Number of bodies matching the search
+    def count(self, search=''):
+        if search not in self.counts:
+            self.counts[search] = self.conn.execute(COUNT_QUERY, (like_pattern(search),)).fetchone()[0]
+        return self.counts[search]
+
+    #Drop cached results after the database has been changed
+    def invalidate(self):
+        self.pages.clear()
+        self.counts.clear()
@@ -0,0 +1,27 @@
+from collections import OrderedDict
+
+
+#Keeps rendered text surfaces so unchanged text is not rasterised again every frame, least recently used entries are dropped first
+class TextCache:
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    #Same arguments as Font.render, with the font first
+    def render(self, font, text, antialias, colour):
+        key = (font, text, tuple(colour), bool(antialias))
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = font.render(text, antialias, colour)
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.max_size:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
@@ -0,0 +1,252 @@
+import math
+from collections import OrderedDict
+import numpy as np
+
+#Zoom levels per doubling of scale that share one simplified trail
+BUCKETS_PER_OCTAVE = 4
+#Simplified trails kept per body, one per zoom bucket
+LOD_CACHE_SIZE = 4
+#Slots a level starts with, it doubles whenever it fills up until it reaches the trail's capacity
+INITIAL_SLOTS = 16
+
+
+#Grow an array along its first axis to the given length, the new rows are zero
+def grow(array, length):
+    grown = np.zeros((length,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+#Per slot simplification state of a trail at one zoom bucket, kept up to date as points are added
+class Simplified:
+    def __init__(self, trail, cell):
+        #Size of a grid cell in world units
+        self.cell = cell
+        #One array per level, the same size as the trail's
+        self.cells = [np.floor(points / cell) for points in trail.points]
+        #Whether each point lands in a different cell from the point before it in the same level
+        self.moved = [np.any(cells != np.roll(cells, 1, axis=0), axis=1) for cells in self.cells]
+        #Trail version the indices were worked out for
+        self.version = None
+        self.indices = None
+
+    #Grid cell of a newly written point, compared with the previous slot of its level, size is the level's current size
+    def add(self, level, slot, x, y, size):
+        if level == len(self.cells):
+            self.cells.append(np.zeros((size, 2)))
+            self.moved.append(np.zeros(size, dtype=bool))
+        elif len(self.cells[level]) < size:
+            self.cells[level] = grow(self.cells[level], size)
+            self.moved[level] = grow(self.moved[level], size)
+        cells = self.cells[level]
+        cells[slot] = np.floor((x / self.cell, y / self.cell))
+        self.moved[level][slot] = np.any(cells[slot] != cells[slot - 1])
+
+
+#Orbit trail with bounded memory, recent points are kept at full resolution and older ones progressively thinned out
+#Level 0 holds the newest points one interval apart, each further level holds every other point evicted from the level below
+#A level is only allocated once points reach it and grows as it fills, so short trails stay small
+class Trail:
+    def __init__(self, duration, interval, capacity=512):
+        #Simulated seconds of history to keep and between full resolution points
+        self.duration = duration
+        self.interval = interval
+        self.capacity = capacity
+        #Level k covers capacity * interval * 2^k seconds, so enough levels to cover the whole duration
+        self.levels = max(1, math.ceil(math.log2(duration / (capacity * interval) + 1)))
+        #One array per allocated level, a level only wraps around once it has grown to the full capacity
+        self.points = []
+        self.times = []
+        #Screen coordinates of every point, kept up to date as points are added
+        self.screen = []
+        #(scale, centre x, centre y) the screen coordinates were calculated with
+        self.projection = None
+        #Next slot to write and number of points held, per level
+        self.heads = [0] * self.levels
+        self.counts = [0] * self.levels
+        #Points evicted from each level so far, every other one is passed down
+        self.evicted = [0] * self.levels
+        self.last_time = None
+        #Changes whenever a point is added, used to invalidate the ordering and simplified trails
+        self.version = 0
+        #(version, [(level, slots)] of every point within the trail duration, oldest first)
+        self.order = None
+        #Zoom bucket -> Simplified
+        self.lod_cache = OrderedDict()
+
+    def __len__(self):
+        return sum(self.counts)
+
+    #Record a point, ignored if it is less than one interval after the last one
+    def append(self, x, y, time):
+        if self.last_time is not None and time - self.last_time < self.interval:
+            return
+        self.last_time = time
+        self.version += 1
+        self.push(0, x, y, time)
+
+    #Make room for one more point in a level, allocating it or doubling its size if needed
+    def reserve(self, level):
+        if level == len(self.points):
+            size = min(INITIAL_SLOTS, self.capacity)
+            self.points.append(np.zeros((size, 2)))
+            self.times.append(np.zeros(size))
+            self.screen.append(np.zeros((size, 2)))
+        elif self.counts[level] == len(self.points[level]) < self.capacity:
+            size = min(2 * len(self.points[level]), self.capacity)
+            self.points[level] = grow(self.points[level], size)
+            self.times[level] = grow(self.times[level], size)
+            self.screen[level] = grow(self.screen[level], size)
+
+    def push(self, level, x, y, time):
+        self.reserve(level)
+        head = self.heads[level]
+        if self.counts[level] == self.capacity:
+            #The slot being overwritten holds the oldest point of this level
+            if level + 1 < self.levels and self.evicted[level] % 2 == 0:
+                old_x, old_y = self.points[level][head]
+                self.push(level + 1, old_x, old_y, self.times[level][head])
+            self.evicted[level] += 1
+        else:
+            self.counts[level] += 1
+        self.points[level][head] = x, y
+        self.times[level][head] = time
+        for simplified in self.lod_cache.values():
+            simplified.add(level, head, x, y, len(self.points[level]))
+        #Only the new point needs projecting
+        if self.projection is not None:
+            scale, centre_x, centre_y = self.projection
+            self.screen[level][head] = x * scale + centre_x, y * scale + centre_y
+        self.heads[level] = (head + 1) % self.capacity
+
+    #Slot order of one level, oldest first
+    def level_order(self, level):
+        count = self.counts[level]
+        start = (self.heads[level] - count) % self.capacity
+        return (start + np.arange(count)) % self.capacity
+
+    #Level and slots of every point within the trail duration, oldest first, worked out once per version
+    def ordered_slots(self):
+        if self.order is not None and self.order[0] == self.version:
+            return self.order[1]
+        segments = []
+        for level in reversed(range(len(self.points))):
+            slots = self.level_order(level)
+            if self.last_time is not None:
+                slots = slots[self.times[level][slots] >= self.last_time - self.duration]
+            if len(slots):
+                segments.append((level, slots))
+        self.order = (self.version, segments)
+        return segments
+
+    #Reproject every held point at once, only needed when the zoom or pan changes
+    def set_projection(self, scale, centre_x, centre_y):
+        projection = (scale, centre_x, centre_y)
+        if projection == self.projection:
+            return
+        self.projection = projection
+        #Held points always fill the first count slots of a level
+        for points, screen, count in zip(self.points, self.screen, self.counts):
+            screen[:count, 0] = points[:count, 0] * scale + centre_x
+            screen[:count, 1] = points[:count, 1] * scale + centre_y
+
+    #Screen coordinates of the two newest points, None while there are fewer than two at full resolution
+    def head_screen_segment(self, scale, centre_x, centre_y):
+        if self.counts[0] < 2:
+            return None
+        self.set_projection(scale, centre_x, centre_y)
+        head = self.heads[0]
+        return self.screen[0][head - 2], self.screen[0][head - 1]
+
+    #Indices of the points worth drawing at a zoom level, points that land in the same tolerance sized cell as the point before are dropped
+    #Cells are worked out once per point as it is recorded, so a new point only costs a lookup of the kept flags
+    def simplify(self, bucket, tolerance):
+        simplified = self.lod_cache.get(bucket)
+        if simplified is None:
+            #Work in world units so the result does not depend on panning
+            simplified = Simplified(self, tolerance / 2 ** (bucket / BUCKETS_PER_OCTAVE))
+            self.lod_cache[bucket] = simplified
+            if len(self.lod_cache) > LOD_CACHE_SIZE:
+                self.lod_cache.popitem(last=False)
+        self.lod_cache.move_to_end(bucket)
+        if simplified.version == self.version:
+            return simplified.indices
+
+        keep = []
+        previous = None
+        for level, slots in self.ordered_slots():
+            moved = simplified.moved[level][slots]
+            #The oldest point of each level follows the newest point of the level above, not the slot before it
+            if previous is not None:
+                moved[0] = np.any(simplified.cells[level][slots[0]] != simplified.cells[previous[0]][previous[1]])
+            previous = (level, slots[-1])
+            keep.append(moved)
+        keep = np.concatenate(keep) if keep else np.zeros(0, dtype=bool)
+        if len(keep):
+            keep[0] = keep[-1] = True
+
+        simplified.indices = np.flatnonzero(keep)
+        simplified.version = self.version
+        return simplified.indices
+
+    #Screen coordinates simplified for the current zoom, looks the same as the full trail to within the tolerance in pixels
+    def lod_screen_points(self, scale, centre_x, centre_y, tolerance=0.5):
+        bucket = math.floor(math.log2(scale) * BUCKETS_PER_OCTAVE)
+        indices = self.simplify(bucket, tolerance)
+        self.set_projection(scale, centre_x, centre_y)
+        #Only the kept points are gathered from the screen buffers, a level at a time
+        rows = []
+        start = 0
+        for level, slots in self.ordered_slots():
+            stop = start + len(slots)
+            kept = indices[np.searchsorted(indices, start):np.searchsorted(indices, stop)]
+            rows.append(self.screen[level][slots[kept - start]])
+            start = stop
+        return np.concatenate(rows) if rows else np.zeros((0, 2))
+
+    #Return the held points and bookkeeping, last_time is nan for an empty trail
+    #Points and times are the first count slots of each level one after another, so the snapshot is as small as the trail
+    def snapshot(self):
+        points = [level[:count] for level, count in zip(self.points, self.counts)]
+        times = [level[:count] for level, count in zip(self.times, self.counts)]
+        return (np.concatenate(points) if points else np.zeros((0, 2)), np.concatenate(times) if times else np.zeros(0),
+                np.array(self.heads), np.array(self.counts), np.array(self.evicted),
+                np.nan if self.last_time is None else self.last_time)
+
+    #Replace the stored points with a snapshot from a trail with the same duration, interval and capacity
+    def restore(self, snapshot):
+        points, times, heads, counts, evicted, last_time = snapshot
+        if len(counts) != self.levels or len(points) != sum(counts):
+            raise ValueError(f"Trail snapshot has {len(counts)} levels and {len(points)} points, expected {self.levels} levels")
+        self.points = []
+        self.times = []
+        self.screen = []
+        start = 0
+        for count in counts:
+            count = int(count)
+            if not count:
+                break
+            size = self.capacity if count == self.capacity else max(count, min(INITIAL_SLOTS, self.capacity))
+            self.points.append(grow(points[start:start + count], size))
+            self.times.append(grow(times[start:start + count], size))
+            self.screen.append(np.zeros((size, 2)))
+            start += count
+        self.heads = [int(head) for head in heads]
+        self.counts = [int(count) for count in counts]
+        self.evicted = [int(count) for count in evicted]
+        self.last_time = None if np.isnan(last_time) else float(last_time)
+        #Screen coordinates and simplified trails are recalculated on the next draw
+        self.projection = None
+        self.lod_cache.clear()
+        self.version += 1
+
+    def clear(self):
+        self.points = []
+        self.times = []
+        self.screen = []
+        self.heads = [0] * self.levels
+        self.counts = [0] * self.levels
+        self.evicted = [0] * self.levels
+        self.last_time = None
+        self.lod_cache.clear()
+        self.version += 1
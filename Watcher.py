@@ -0,0 +1,69 @@
+import sqlite3 as sql
+import Catalogue as catalogue
+
+#Bodies logged in body_changes after a given seq, up to and including another
+CHANGED_QUERY = catalogue.BODY_SELECT + """
+    WHERE celestial_bodies.id IN (SELECT celestial_body_id FROM body_changes WHERE seq > ? AND seq <= ?)
+"""
+CHANGED_IDS_QUERY = "SELECT celestial_body_id FROM body_changes WHERE seq > ? AND seq <= ?"
+
+
+#Notices bodies edited in the database by another connection (e.g. the database editor) while the simulator runs
+class ChangeWatcher:
+    #Seconds between checks, checking is cheap but there is no need to do it every frame
+    INTERVAL = 0.5
+
+    #Bodies already loaded from the database can be passed in keyed by id, otherwise every body is loaded
+    def __init__(self, path, bodies=None):
+        self.conn = sql.connect(path)
+        # WAL lets the editor commit while the simulator reads, the database file remembers the setting
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.data_version = self.get_data_version()
+        self.last_seq = self.get_last_seq()
+        #Last loaded state of every body, keyed by id, so only changed values are applied
+        if bodies is None:
+            bodies = {id: catalogue.to_body(row) for id, *row in self.conn.execute(catalogue.BODY_QUERY)}
+        self.bodies = dict(bodies)
+        self.last_check = None
+
+    #Changes whenever another connection commits to the database
+    def get_data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def get_last_seq(self):
+        return self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM body_changes").fetchone()[0]
+
+    #Return a list of (old, new) bodies changed since the last check, old is None for added bodies and new is None for deleted ones
+    def poll(self, now):
+        if self.last_check is not None and now - self.last_check < self.INTERVAL:
+            return []
+        self.last_check = now
+        version = self.get_data_version()
+        if version == self.data_version:
+            return []
+        self.data_version = version
+
+        last_seq = self.get_last_seq()
+        if last_seq == self.last_seq:
+            return []
+        bounds = (self.last_seq, last_seq)
+        self.last_seq = last_seq
+        changed = self.conn.execute(CHANGED_QUERY, bounds).fetchall()
+        ids = [row[0] for row in self.conn.execute(CHANGED_IDS_QUERY, bounds)]
+
+        changes = []
+        for id, *row in changed:
+            body = catalogue.to_body(row)
+            old = self.bodies.get(id)
+            if body != old:
+                changes.append((old, body))
+                self.bodies[id] = body
+        # logged bodies that can no longer be loaded have been deleted
+        found = {row[0] for row in changed}
+        for id in ids:
+            if id not in found and id in self.bodies:
+                changes.append((self.bodies.pop(id), None))
+        return changes
+
+    def close(self):
+        self.conn.close()
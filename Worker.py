@@ -0,0 +1,139 @@
+import queue
+import threading
+import time
+import numpy as np
+import Scheduler as scheduling
+
+
+#Bounded ring of system snapshots with one writer and one reader, neither side ever takes a lock
+class SnapshotRing:
+    def __init__(self, bodies, particles=0, capacity=4):
+        self.capacity = capacity
+        #Test particle positions from every swarm, one after another
+        self.particle_positions = np.zeros((capacity, particles, 2), dtype=np.float64)
+        self.positions = np.zeros((capacity, bodies, 2), dtype=np.float64)
+        self.velocities = np.zeros((capacity, bodies, 2), dtype=np.float64)
+        self.render_positions = np.zeros((capacity, bodies, 2), dtype=np.float64)
+        self.distance_to_sun = np.zeros((capacity, bodies), dtype=np.float64)
+        self.time = np.zeros(capacity, dtype=np.float64)
+        #Per slot sequence numbers, odd while the slot is being written
+        self.sequence = [0] * capacity
+        #Number of snapshots published so far
+        self.published = 0
+
+    #Copy the system into the next slot, overwriting the oldest snapshot
+    def publish(self, system, render_positions):
+        slot = self.published % self.capacity
+        self.sequence[slot] += 1
+        self.positions[slot] = system.positions
+        self.velocities[slot] = system.velocities
+        self.render_positions[slot] = render_positions
+        self.distance_to_sun[slot] = system.distance_to_sun
+        if system.particles:
+            self.particle_positions[slot] = np.vstack([swarm.positions for swarm in system.particles])
+        self.time[slot] = system.time
+        self.sequence[slot] += 1
+        self.published += 1
+
+    #Copy the newest snapshot into the system if it is newer than the one last read, returns the new count
+    #Snapshots are skipped while the system has a different number of bodies, e.g. until the worker has added a new one
+    def read_latest(self, system, last_read):
+        if self.positions.shape[1] != len(system):
+            return last_read
+        while True:
+            published = self.published
+            if published == last_read:
+                return last_read
+            slot = (published - 1) % self.capacity
+            sequence = self.sequence[slot]
+            if sequence % 2:
+                continue
+            positions = self.positions[slot].copy()
+            velocities = self.velocities[slot].copy()
+            render_positions = self.render_positions[slot].copy()
+            distance_to_sun = self.distance_to_sun[slot].copy()
+            particle_positions = self.particle_positions[slot].copy()
+            sim_time = self.time[slot]
+            #Try again if the writer reused the slot while we were copying
+            if self.sequence[slot] != sequence:
+                continue
+            system.positions[:] = positions
+            system.velocities[:] = velocities
+            system.distance_to_sun[:] = distance_to_sun
+            system.render_positions = render_positions
+            system.time = float(sim_time)
+            start = 0
+            for swarm in system.particles:
+                swarm.positions = particle_positions[start:start + len(swarm)]
+                start += len(swarm)
+            return published
+
+
+#Runs the integrator on its own thread and publishes snapshots for the renderer
+class PhysicsWorker(threading.Thread):
+    #Seconds to sleep when there is nothing to simulate
+    IDLE_SLEEP = 0.001
+
+    def __init__(self, system, integrator, timestep, days_per_second, paused=False):
+        super().__init__(daemon=True)
+        #The worker owns its own copy, the renderer only ever sees snapshots
+        self.system = system.copy()
+        self.scheduler = scheduling.FixedStepScheduler(self.system, integrator, timestep, days_per_second)
+        self.ring = SnapshotRing(len(system), sum(len(swarm) for swarm in system.particles))
+        self.commands = queue.Queue()
+        self.paused = paused
+        self.running = True
+
+    #Send a command to the worker, e.g. ('pause', True), ('days_per_second', 100), ('set', 'masses', index, value),
+    #('add', x, y, mass, x_vel, y_vel) or ('copy', queue) to have a consistent copy of the system put on the queue
+    def send(self, *command):
+        self.commands.put(command)
+
+    def stop(self):
+        self.send('stop')
+        self.join()
+
+    def handle(self, command):
+        name, *args = command
+        if name == 'stop':
+            self.running = False
+        elif name == 'pause':
+            self.paused = args[0]
+        elif name == 'days_per_second':
+            self.scheduler.days_per_second = args[0]
+        elif name == 'timestep':
+            self.scheduler.timestep = args[0]
+        elif name == 'set':
+            #Edit one row of one of the system's arrays
+            array, index, value = args
+            getattr(self.system, array)[index] = value
+            self.scheduler.previous_positions = self.system.positions.copy()
+            self.ring.publish(self.system, self.system.positions)
+        elif name == 'add':
+            #Snapshots have room for a fixed number of bodies, so a ring one body larger replaces the current one
+            self.system.add_body(*args)
+            ring = SnapshotRing(len(self.system), self.ring.particle_positions.shape[1], self.ring.capacity)
+            ring.published = self.ring.published
+            self.ring = ring
+            self.ring.publish(self.system, self.system.positions)
+        elif name == 'copy':
+            args[0].put(self.system.copy())
+        else:
+            raise ValueError(f"Unknown worker command '{name}'")
+
+    def run(self):
+        last = time.perf_counter()
+        self.ring.publish(self.system, self.system.positions)
+        while self.running:
+            try:
+                while True:
+                    self.handle(self.commands.get_nowait())
+            except queue.Empty:
+                pass
+
+            now = time.perf_counter()
+            wall_time, last = now - last, now
+            if self.paused or not self.scheduler.advance(wall_time):
+                time.sleep(self.IDLE_SLEEP)
+                continue
+            self.ring.publish(self.system, self.system.render_positions)